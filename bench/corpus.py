@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+
+WORDS = (
+    "the ring hobbit shire elves mountain river road night fire king sword "
+    "friend journey shadow light tower forest wizard song stone gate"
+).split()
+
+SHAPES = {
+    # shape: (pages, paragraphs per page)
+    "small": (2000, 4),
+    "huge": (4, 4000),
+    "links": (300, 30),
+    "lists": (300, 30),
+}
+
+
+def sentence(rng: random.Random, links=0) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+    i = rng.randrange(len(words))
+    words[i] = f"**{words[i]}**"
+    j = rng.randrange(len(words))
+    words[j] = f"*{words[j]}*"
+    if rng.random() < 0.3:
+        words.append(f"`{rng.choice(WORDS)}()`")
+    for _ in range(links):
+        target = rng.choice(WORDS)
+        words.insert(rng.randrange(len(words)), f"[{target}](/{target}/)")
+    return " ".join(words).capitalize() + "."
+
+
+def page(rng: random.Random, shape: str, paragraphs: int) -> str:
+    blocks = [f"# {' '.join(rng.choice(WORDS) for _ in range(3)).title()}"]
+    for i in range(paragraphs):
+        kind = rng.random()
+        if shape == "lists" and kind < 0.7:
+            items = [f"* {sentence(rng)}" for _ in range(rng.randint(3, 12))]
+            blocks.append("\n".join(items))
+        elif shape == "links":
+            blocks.append(" ".join(sentence(rng, links=4) for _ in range(3)))
+        elif kind < 0.1:
+            blocks.append(f"## {sentence(rng)}")
+        elif kind < 0.2:
+            blocks.append("\n".join(f"{n}. {sentence(rng)}" for n in range(1, 6)))
+        elif kind < 0.25:
+            blocks.append("> " + sentence(rng))
+        elif kind < 0.3:
+            code = "\n".join(f"print({rng.choice(WORDS)!r})" for _ in range(4))
+            blocks.append(f"```\n{code}\n```")
+        else:
+            blocks.append(" ".join(sentence(rng) for _ in range(rng.randint(2, 5))))
+        if i % 50 == 49:
+            blocks.append("![map](/images/rivendell.png)")
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(dest: str, shape: str, scale=1.0, seed=0) -> list[str]:
+    pages, paragraphs = SHAPES[shape]
+    pages = max(1, int(pages * scale))
+    rng = random.Random(f"{shape}-{seed}")
+    paths = []
+    for i in range(pages):
+        folder = os.path.join(dest, f"section{i % 20}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"page{i}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(page(rng, shape, paragraphs))
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic content tree")
+    parser.add_argument("dest")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="small")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    paths = generate_corpus(args.dest, args.shape, args.scale, args.seed)
+    print(f"{len(paths)} pages written to {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
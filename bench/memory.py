@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from htmlnode import LeafNode, NodeArena, ParentNode  # noqa: E402
+from markdown import markdown_to_html_node  # noqa: E402
+from textnode import TextNode, text_to_textnodes  # noqa: E402
+
+
+# The node layout before __slots__: one __dict__ per instance and a children
+# attribute on every leaf. Used as the reference the compact nodes are
+# measured against.
+class DictNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def long_page(paragraphs: int) -> str:
+    paragraph = (
+        "Some **bold** words, an *italic* one, `code`, a [link](/page) and "
+        "![an image](/images/rivendell.png) in every sentence."
+    )
+    blocks = ["# Long page"]
+    for i in range(paragraphs):
+        blocks.append(f"{paragraph} {i}")
+        blocks.append(f"* item {i}\n* **item** {i + 1}")
+    return "\n\n".join(blocks)
+
+
+def to_dict_nodes(node):
+    if isinstance(node, ParentNode):
+        return DictNode(node.tag, None, [to_dict_nodes(c) for c in node.children])
+    return DictNode(node.tag, node.value, None, node.props)
+
+
+def to_slot_nodes(node):
+    if isinstance(node, ParentNode):
+        return ParentNode(node.tag, [to_slot_nodes(c) for c in node.children])
+    return LeafNode(node.tag, node.value, node.props)
+
+
+def measure(build) -> tuple[int, object]:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Node memory benchmark")
+    parser.add_argument("--paragraphs", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    markdown = long_page(args.paragraphs)
+    tree = markdown_to_html_node(markdown)
+    text_nodes = text_to_textnodes(markdown.replace("\n", " "))
+
+    # Every variant is copied from the same parsed document, so the strings
+    # are shared and only the node objects themselves are measured.
+    results = [
+        ("html nodes, __dict__", measure(lambda: to_dict_nodes(tree))),
+        ("html nodes, __slots__", measure(lambda: to_slot_nodes(tree))),
+        ("html nodes, NodeArena", measure(lambda: NodeArena.from_node(tree))),
+        (
+            "text nodes, __dict__",
+            measure(
+                lambda: [DictTextNode(n.text, n.text_type, n.url) for n in text_nodes]
+            ),
+        ),
+        (
+            "text nodes, __slots__",
+            measure(lambda: [TextNode(n.text, n.text_type, n.url) for n in text_nodes]),
+        ),
+    ]
+    reference = {}
+    for name, (size, _) in results:
+        kind = name.split(",")[0]
+        reference.setdefault(kind, size)
+        print(f"{name:24} {size / 1024:10.1f} KiB {size / reference[kind]:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from corpus import SHAPES, generate_corpus  # noqa: E402
+from markdown import (  # noqa: E402
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+)
+from page import parse_page  # noqa: E402
+from textnode import text_to_textnodes  # noqa: E402
+
+RESULTS_PATH = os.path.join(ROOT, "bench", "results.json")
+BASELINE_PATH = os.path.join(ROOT, "bench", "baseline.json")
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_all(paths: list[str]) -> list[str]:
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def write_all(folder: str, pages: list[str]) -> None:
+    for i, html in enumerate(pages):
+        with open(os.path.join(folder, f"{i}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+def run_build(site: str, jobs: int) -> None:
+    env = dict(os.environ, SOURCE_PATH="static", CONTENT_PATH="content")
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "src", "main.py"), "--jobs", str(jobs)],
+        cwd=site,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def bench_shape(shape: str, folder: str, scale: float, seed: int, repeat: int) -> dict:
+    site = os.path.join(folder, shape)
+    content = os.path.join(site, "content")
+    paths = generate_corpus(content, shape, scale, seed)
+    shutil.copytree(os.path.join(ROOT, "static"), os.path.join(site, "static"))
+    shutil.copy(os.path.join(ROOT, "template.html"), site)
+    os.makedirs(os.path.join(site, "public"))
+    out = os.path.join(folder, f"{shape}-out")
+    os.makedirs(out)
+
+    texts = read_all(paths)
+    blocks = [block for text in texts for block in markdown_to_blocks(text)]
+    trees = [markdown_to_html_node(text) for text in texts]
+    pages = [tree.to_html() for tree in trees]
+
+    results = {
+        "pages": len(paths),
+        "bytes": sum(len(text) for text in texts),
+        "read": best_time(lambda: read_all(paths), repeat),
+        "markdown_to_blocks": best_time(
+            lambda: [markdown_to_blocks(text) for text in texts], repeat
+        ),
+        "block_to_block_type": best_time(
+            lambda: [block_to_block_type(block) for block in blocks], repeat
+        ),
+        "text_to_textnodes": best_time(
+            lambda: [text_to_textnodes(block) for block in blocks], repeat
+        ),
+        "markdown_to_html_node": best_time(
+            lambda: [markdown_to_html_node(text) for text in texts], repeat
+        ),
+        "parse_page": best_time(lambda: [parse_page(text) for text in texts], repeat),
+        "to_html": best_time(lambda: [tree.to_html() for tree in trees], repeat),
+        "write": best_time(lambda: write_all(out, pages), repeat),
+        "build": best_time(lambda: run_build(site, 1), repeat),
+        "build_all_cores": best_time(lambda: run_build(site, 0), repeat),
+    }
+    return results
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float, min_delta: float
+) -> list[str]:
+    regressions = []
+    for shape, stages in results["shapes"].items():
+        for stage, seconds in stages.items():
+            if stage in ("pages", "bytes"):
+                continue
+            before = baseline.get("shapes", {}).get(shape, {}).get(stage)
+            if before is None or seconds - before < min_delta:
+                continue
+            if seconds > before * (1 + threshold):
+                regressions.append(
+                    f"{shape}.{stage}: {before:.4f}s -> {seconds:.4f}s "
+                    f"(+{(seconds / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every build stage")
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES))
+    parser.add_argument("--scale", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="allowed slowdown against the baseline (0.15 is 15%%)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.005,
+        help="ignore slowdowns smaller than this many seconds",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store these results as the new baseline",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "shapes": {},
+    }
+    with tempfile.TemporaryDirectory() as folder:
+        for shape in args.shape or sorted(SHAPES):
+            stages = bench_shape(shape, folder, args.scale, args.seed, args.repeat)
+            results["shapes"][shape] = stages
+            print(f"{shape}: {stages['pages']} pages, {stages['bytes']} bytes")
+            for stage, seconds in stages.items():
+                if stage not in ("pages", "bytes"):
+                    print(f"  {stage:22} {seconds * 1000:10.2f} ms")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        shutil.copy(args.output, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != args.scale or baseline.get("seed") != args.seed:
+        print("Baseline was recorded with another scale or seed, not comparing")
+        return 0
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
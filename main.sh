@@ -4,5 +4,8 @@ source_path=${1:-"static"}
 content_path=${2:-"content"}
 export SOURCE_PATH=$source_path
 export CONTENT_PATH=$content_path
-./.venv/bin/python src/main.py
+if [[ " ${*:3} " == *" --watch "* || " ${*:3} " == *" --serve "* ]]; then
+    exec ./.venv/bin/python src/main.py "${@:3}"
+fi
+./.venv/bin/python src/main.py "${@:3}"
 cd public && ../.venv/bin/python -m http.server 8888
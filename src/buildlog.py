@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import multiprocessing
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_PATH = ".log"
+
+# Attributes every LogRecord has. Anything else on a record was passed in
+# extra= and is written as a field of its own.
+RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))
+) | {"message", "asctime", "taskName"}
+
+_listener: QueueListener | None = None
+_worker_queue = None
+_worker_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class BufferedHandler(QueueHandler):
+    # Records are handed to the listener thread as they are. The message is
+    # only formatted there, off the build's hot path.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(path=LOG_PATH, level=logging.INFO) -> None:
+    global _listener
+    stop_logging()
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    # The listener threads are daemons, the queued records are written
+    # before the interpreter exits.
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+    root = logging.getLogger()
+    root.handlers = [BufferedHandler(records)]
+    root.setLevel(level)
+
+
+def worker_log_queue():
+    # Worker processes can not reach the listener thread, so their records
+    # go through a process queue drained by a second listener.
+    global _worker_queue, _worker_listener
+    if _listener is None:
+        return None
+    if _worker_queue is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = QueueListener(_worker_queue, *_listener.handlers)
+        _worker_listener.start()
+    return _worker_queue
+
+
+def configure_worker_logging(records) -> None:
+    root = logging.getLogger()
+    if records is None:
+        # Forked workers inherit the parent's handler, whose queue nobody
+        # drains in the worker.
+        root.handlers = []
+        return
+    root.handlers = [QueueHandler(records)]
+    root.setLevel(logging.INFO)
+
+
+def stop_logging() -> None:
+    global _listener, _worker_queue, _worker_listener
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_queue.close()
+        _worker_queue = _worker_listener = None
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    logging.getLogger().handlers = []
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from manifest import GENERATOR_VERSION
+
+BLOCK_CACHE_PATH = os.path.join(".cache", "blocks.json")
+BLOCK_CACHE_SIZE = 64 * 1024 * 1024
+# Bytes an entry takes in the OrderedDict besides its key and HTML strings.
+ENTRY_OVERHEAD = 100
+
+
+class BlockCache:
+    def __init__(self, max_bytes: int = BLOCK_CACHE_SIZE, salt=""):
+        self.max_bytes = max_bytes
+        # Anything besides the markdown that changes the rendered HTML, such as
+        # the fingerprinted asset URLs, goes into the salt.
+        self.salt = salt
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.new_keys: set[str] = set()
+
+    @staticmethod
+    def key(block_type: str, block: str, salt="") -> str:
+        digest = hashlib.blake2b(block.encode("utf-8"), digest_size=16)
+        digest.update(str(block_type).encode("utf-8"))
+        if salt:
+            digest.update(salt.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def entry_size(key: str, html: str) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(html) + ENTRY_OVERHEAD
+
+    def get(self, key: str) -> str | None:
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key: str, html: str, new=True) -> None:
+        size = self.entry_size(key, html)
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= self.entry_size(key, old)
+        self.entries[key] = html
+        self.size += size
+        if new:
+            self.new_keys.add(key)
+        while self.size > self.max_bytes:
+            evicted_key, evicted = self.entries.popitem(last=False)
+            self.size -= self.entry_size(evicted_key, evicted)
+            self.new_keys.discard(evicted_key)
+            self.evictions += 1
+
+    def take_new_entries(self) -> list[tuple[str, str]]:
+        entries = [(key, self.entries[key]) for key in self.new_keys]
+        self.new_keys.clear()
+        return entries
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def add_stats(self, stats: dict) -> None:
+        self.hits += stats["hits"]
+        self.misses += stats["misses"]
+        self.evictions += stats["evictions"]
+
+    def load(self, path: str = BLOCK_CACHE_PATH) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != GENERATOR_VERSION:
+            return
+        for key, html in data["entries"]:
+            self.put(key, html, new=False)
+
+    def save(self, path: str = BLOCK_CACHE_PATH) -> None:
+        folders = os.path.dirname(path)
+        if folders:
+            os.makedirs(folders, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": GENERATOR_VERSION, "entries": list(self.entries.items())},
+                f,
+            )
+        os.replace(tmp_path, path)
+        self.new_keys.clear()
+
+
+_block_cache: BlockCache | None = None
+
+
+def configure_block_cache(max_bytes: int, path: str | None = None, salt="") -> None:
+    global _block_cache
+    if max_bytes <= 0:
+        _block_cache = None
+        return
+    _block_cache = BlockCache(max_bytes, salt)
+    if path is not None:
+        _block_cache.load(path)
+
+
+def get_block_cache() -> BlockCache | None:
+    return _block_cache
@@ -0,0 +1,119 @@
+import gzip
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from manifest import hash_bytes, hash_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = (".html", ".css", ".js")
+# Files smaller than this fit in a packet anyway, and a compressed sibling is
+# only kept when it saves at least MIN_SAVING of the original size.
+MIN_SIZE = 256
+MIN_SAVING = 0.1
+
+
+def encoders() -> dict:
+    encoders = {".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders[".br"] = lambda data: brotli.compress(data, quality=11)
+    return encoders
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def remove_siblings(path: str, extensions) -> None:
+    for extension in extensions:
+        if os.path.exists(path + extension):
+            os.remove(path + extension)
+
+
+def compress_file(path: str) -> tuple[str, list[str], int]:
+    with open(path, "rb") as f:
+        data = f.read()
+    written = []
+    saved = 0
+    for extension, encode in encoders().items():
+        compressed = encode(data) if len(data) >= MIN_SIZE else None
+        if compressed is not None and len(compressed) <= len(data) * (1 - MIN_SAVING):
+            write_atomic(path + extension, compressed)
+            written.append(extension)
+            saved += len(data) - len(compressed)
+        else:
+            remove_siblings(path, [extension])
+    return hash_bytes(data), written, saved
+
+
+def is_compressed(entry: dict | None, path: str, digest: str) -> bool:
+    if entry is None or entry["hash"] != digest:
+        return False
+    # Installing brotli later has to add the .br siblings.
+    if entry["encoders"] != sorted(encoders()):
+        return False
+    return all(os.path.exists(path + extension) for extension in entry["encodings"])
+
+
+def compress_outputs(
+    dest_dir_path: str, previous: dict | None = None, jobs=1, verbose=True
+) -> dict:
+    previous = previous or {}
+    records = {}
+    changed = []
+    for root, dirs, files in os.walk(dest_dir_path):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(root, file)
+            relative_path = os.path.relpath(path, dest_dir_path)
+            digest = hash_file(path)
+            entry = previous.get(relative_path)
+            if is_compressed(entry, path, digest):
+                records[relative_path] = entry
+            else:
+                changed.append((relative_path, path))
+
+    paths = [path for _, path in changed]
+    if jobs == 1 or len(paths) < 2:
+        results = [compress_file(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+            results = list(pool.map(compress_file, paths, chunksize=8))
+
+    saved = 0
+    for (relative_path, path), (digest, written, file_saved) in zip(changed, results):
+        records[relative_path] = {
+            "hash": digest,
+            "encodings": written,
+            "encoders": sorted(encoders()),
+        }
+        saved += file_saved
+        logger.info(
+            "%s has been compressed",
+            path,
+            extra={"event": "compress", "encodings": written},
+        )
+
+    for relative_path in previous.keys() - records.keys():
+        remove_siblings(os.path.join(dest_dir_path, relative_path), (".gz", ".br"))
+
+    logger.info(
+        "Compressed %d files, saved %d bytes",
+        len(changed),
+        saved,
+        extra={"event": "compress_total"},
+    )
+    if verbose:
+        print(f"Compressed {len(changed)} files, saved {saved} bytes")
+    return records
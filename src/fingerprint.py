@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import re
+
+from inventory import scan_assets
+from manifest import hash_bytes
+from sync import copy_file
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".avif",
+    ".svg",
+    ".woff",
+    ".woff2",
+    ".ttf",
+)
+FINGERPRINT_LENGTH = 10
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+
+url_attribute_re = re.compile(r'\b(src|href)="(/[^"]*)"')
+
+_asset_map: dict[str, str] = {}
+_asset_map_digest = ""
+
+
+def fingerprint_name(relative_path: str, digest: str) -> str:
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def build_asset_map(source_folder: str, files=None) -> dict[str, str]:
+    # Maps the site URL of every static asset, e.g. /images/a.png, to the URL
+    # of its fingerprinted copy.
+    if files is None:
+        files = scan_assets(source_folder, "")
+    asset_map = {}
+    for file in files:
+        if file.relative_path.lower().endswith(FINGERPRINT_EXTENSIONS):
+            hashed_path = fingerprint_name(file.relative_path, file.digest())
+            asset_map[f"/{file.relative_path}"] = f"/{hashed_path}"
+    return asset_map
+
+
+def write_fingerprinted(
+    source_folder: str,
+    dest_folder: str,
+    asset_map: dict[str, str],
+    previous: dict[str, str] | None = None,
+    verbose=True,
+) -> None:
+    # The hashed copies are written next to the original files, which stay in
+    # place for anything that still uses the plain names (e.g. url() in CSS).
+    for url, hashed_url in asset_map.items():
+        des_path = os.path.join(dest_folder, *hashed_url[1:].split("/"))
+        if os.path.exists(des_path):
+            continue
+        src_path = os.path.join(source_folder, *url[1:].split("/"))
+        os.makedirs(os.path.dirname(des_path), exist_ok=True)
+        method = copy_file(src_path, des_path)
+        logger.info(
+            "%s has been created",
+            des_path,
+            extra={"event": "fingerprint", "method": method},
+        )
+        if verbose:
+            print(f"{des_path} has been created")
+    for hashed_url in set((previous or {}).values()) - set(asset_map.values()):
+        des_path = os.path.join(dest_folder, *hashed_url[1:].split("/"))
+        if os.path.exists(des_path):
+            os.remove(des_path)
+        logger.info("%s has been removed", des_path, extra={"event": "remove"})
+        if verbose:
+            print(f"{des_path} has been removed")
+    manifest_path = os.path.join(dest_folder, ASSET_MANIFEST_NAME)
+    if not asset_map:
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        return
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(asset_map, f, indent=1, sort_keys=True)
+
+
+def configure_asset_map(asset_map: dict[str, str] | None) -> None:
+    global _asset_map, _asset_map_digest
+    _asset_map = asset_map or {}
+    _asset_map_digest = ""
+    if _asset_map:
+        encoded = json.dumps(_asset_map, sort_keys=True).encode("utf-8")
+        _asset_map_digest = hash_bytes(encoded)
+
+
+def get_asset_map() -> dict[str, str]:
+    return _asset_map
+
+
+def asset_map_digest() -> str:
+    return _asset_map_digest
+
+
+def asset_url(url: str) -> str:
+    return _asset_map.get(url, url)
+
+
+def rewrite_asset_urls(html: str) -> str:
+    if not _asset_map:
+        return html
+    return url_attribute_re.sub(
+        lambda match: f'{match.group(1)}="{asset_url(match.group(2))}"', html
+    )
@@ -0,0 +1,47 @@
+import json
+import os
+
+from manifest import GENERATOR_VERSION, hash_bytes
+from pipeline import replace_file
+
+# Fragments are stored next to the manifest they belong to.
+FRAGMENT_FOLDER = "fragments"
+FRAGMENT_PATH = os.path.join(".cache", FRAGMENT_FOLDER)
+
+
+def fragment_key(source_hash: str, salt="") -> str:
+    # The rendered content of a page only depends on its markdown and the
+    # build wide salt (minify, fingerprinted assets, images), not on the
+    # template it is spliced into.
+    return hash_bytes(f"{GENERATOR_VERSION} {source_hash} {salt}".encode("utf-8"))
+
+
+def fragment_path(key: str, folder=FRAGMENT_PATH) -> str:
+    return os.path.join(folder, key[:2], f"{key}.json")
+
+
+def write_fragment(path: str, title: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with replace_file(path) as f:
+        json.dump({"title": title, "content": content}, f, ensure_ascii=False)
+
+
+def load_fragment(text: str) -> tuple[str, str]:
+    data = json.loads(text)
+    return data["title"], data["content"]
+
+
+def remove_unused_fragments(keys: set[str], folder=FRAGMENT_PATH) -> int:
+    removed = 0
+    if not os.path.isdir(folder):
+        return removed
+    with os.scandir(folder) as prefixes:
+        for prefix in prefixes:
+            if not prefix.is_dir():
+                continue
+            with os.scandir(prefix.path) as entries:
+                for entry in entries:
+                    if entry.name.removesuffix(".json") not in keys:
+                        os.remove(entry.path)
+                        removed += 1
+    return removed
@@ -1,6 +1,14 @@
+import sys
+from array import array
+
+from minify import PRESERVE_TAGS, collapse_whitespace, minify_fragment
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
         self.props = props
@@ -8,6 +16,15 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError
 
+    def iter_html(self, minify=False):
+        if minify:
+            yield from iter_minified(self)
+        else:
+            yield self.to_html()
+
+    def write_to(self, fp, minify=False) -> None:
+        fp.writelines(self.iter_html(minify))
+
     def props_to_html(self) -> str:
         result = []
         for key, value in self.props.items():
@@ -19,6 +36,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value: str, props=None):
         super().__init__(tag=tag, value=value, props=props, children=None)
 
@@ -36,21 +55,164 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children: list, value=None, props=None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
     def to_html(self) -> str:
-        if self.tag is None:
-            raise ValueError("There is no tag")
-        if self.children is None:
-            raise ValueError("There is not children")
+        return "".join(self.iter_html())
 
-        result = []
-        for node in self.children:
-            result.append(node.to_html())
-        if self.props:
-            return f"<{self.tag} {self.props_to_html()}>{''.join(result)}</{self.tag}>"
-        return f"<{self.tag}>{''.join(result)}</{self.tag}>"
+    def iter_html(self, minify=False):
+        if minify:
+            yield from iter_minified(self)
+            return
+        # Walks the tree with an explicit stack of nodes and closing tags, so
+        # every chunk is yielded once and no level builds its own string.
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if type(node) is str:
+                yield node
+            elif isinstance(node, ParentNode):
+                if node.tag is None:
+                    raise ValueError("There is no tag")
+                if node.children is None:
+                    raise ValueError("There is not children")
+                if node.props:
+                    yield f"<{node.tag} {node.props_to_html()}>"
+                else:
+                    yield f"<{node.tag}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield from node.iter_html()
 
     def __repr__(self):
         return f"<ParentNode {self.tag} {self.children} {self.props}>"
+
+
+def open_tag(node: HTMLNode) -> str:
+    if node.props:
+        return f"<{node.tag} {node.props_to_html()}>"
+    return f"<{node.tag}>"
+
+
+def iter_minified(node: HTMLNode):
+    # Same walk as ParentNode.iter_html, but text outside of preserved
+    # elements has its whitespace collapsed. `preserved` counts the open
+    # PRESERVE_TAGS ancestors, and None on the stack marks where one closes.
+    stack = [node]
+    preserved = 0
+    while stack:
+        node = stack.pop()
+        if node is None:
+            preserved -= 1
+        elif type(node) is str:
+            yield node
+        elif isinstance(node, ParentNode):
+            if node.tag is None:
+                raise ValueError("There is no tag")
+            if node.children is None:
+                raise ValueError("There is not children")
+            yield open_tag(node)
+            stack.append(f"</{node.tag}>")
+            if node.tag in PRESERVE_TAGS:
+                preserved += 1
+                stack.append(None)
+            stack.extend(reversed(node.children))
+        elif preserved or node.tag in PRESERVE_TAGS:
+            yield node.to_html()
+        elif node.tag is None:
+            if node.value is None:
+                raise ValueError("All leaf nodes must have a value")
+            # Untagged leaves may hold raw HTML, e.g. cached block fragments.
+            yield minify_fragment(node.value)
+        else:
+            if node.value is None:
+                raise ValueError("All leaf nodes must have a value")
+            yield f"{open_tag(node)}{collapse_whitespace(node.value)}</{node.tag}>"
+
+
+# A whole document tree flattened into parallel arrays. Node 0 is the root,
+# children are linked through first_child/next_sibling indexes (-1 for none)
+# and leaves are the nodes whose value is not None.
+class NodeArena:
+    __slots__ = ("tags", "values", "props", "first_child", "next_sibling", "_last")
+
+    def __init__(self):
+        self.tags = []
+        self.values = []
+        self.props = []
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self._last = array("i")
+
+    def __len__(self):
+        return len(self.tags)
+
+    def add(self, tag, value=None, props=None, parent=-1) -> int:
+        index = len(self.tags)
+        self.tags.append(sys.intern(tag) if type(tag) is str else tag)
+        self.values.append(value)
+        self.props.append(props or None)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self._last.append(-1)
+        if parent != -1:
+            last = self._last[parent]
+            if last == -1:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[last] = index
+            self._last[parent] = index
+        return index
+
+    @classmethod
+    def from_node(cls, node: HTMLNode) -> "NodeArena":
+        arena = cls()
+        stack = [(node, -1)]
+        while stack:
+            node, parent = stack.pop()
+            if isinstance(node, ParentNode):
+                index = arena.add(node.tag, props=node.props, parent=parent)
+                stack.extend((child, index) for child in reversed(node.children))
+            else:
+                if node.value is None:
+                    raise ValueError("All leaf nodes must have a value")
+                arena.add(node.tag, node.value, node.props, parent=parent)
+        return arena
+
+    def iter_html(self, index=0):
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            if type(index) is str:
+                yield index
+                continue
+            tag = self.tags[index]
+            value = self.values[index]
+            attributes = ""
+            if self.props[index]:
+                attributes = " " + " ".join(
+                    f'{key}="{prop}"' for key, prop in self.props[index].items()
+                )
+            if value is not None and tag is None:
+                yield value
+            elif value is not None:
+                yield f"<{tag}{attributes}>{value}</{tag}>"
+            else:
+                yield f"<{tag}{attributes}>"
+                stack.append(f"</{tag}>")
+                children = []
+                child = self.first_child[index]
+                while child != -1:
+                    children.append(child)
+                    child = self.next_sibling[child]
+                stack.extend(reversed(children))
+
+    def to_html(self) -> str:
+        return "".join(self.iter_html())
+
+    def write_to(self, fp) -> None:
+        fp.writelines(self.iter_html())
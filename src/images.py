@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from inventory import scan_assets
+from manifest import hash_bytes
+from pipeline import temp_path
+from sync import copy_file
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+IMAGE_WIDTHS = (480, 960, 1440)
+WEBP_QUALITY = 80
+IMAGE_CACHE_PATH = os.path.join(".cache", "images")
+
+_image_table: dict[str, dict] = {}
+_image_table_digest = ""
+
+
+def image_size(path: str) -> tuple[int, int] | None:
+    # Reads the dimensions from the file header, so width and height can be
+    # emitted even without Pillow.
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+            if head[12:16] == b"VP8X":
+                width = int.from_bytes(head[24:27], "little") + 1
+                height = int.from_bytes(head[27:30], "little") + 1
+                return width, height
+            if head[12:16] == b"VP8L":
+                f.seek(21)
+                bits = int.from_bytes(f.read(4), "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if head[12:16] == b"VP8 ":
+                f.seek(26)
+                width, height = struct.unpack("<HH", f.read(4))
+                return width & 0x3FFF, height & 0x3FFF
+            return None
+        if not head.startswith(b"\xff\xd8"):
+            return None
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            length = struct.unpack(">H", f.read(2))[0]
+            # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC).
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def process_image(path: str, digest: str, cache_dir: str) -> dict:
+    # Runs in the worker processes. Variants are written to the cache folder
+    # as <source hash>-<width>.webp.
+    if Image is None:
+        width, height = image_size(path) or (None, None)
+        return {"width": width, "height": height, "variants": [], "resized": False}
+    variants = []
+    with Image.open(path) as image:
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for variant_width in [w for w in IMAGE_WIDTHS if w < width] + [width]:
+            name = f"{digest}-{variant_width}.webp"
+            variant_path = os.path.join(cache_dir, name)
+            if not os.path.exists(variant_path):
+                variant_height = max(1, round(height * variant_width / width))
+                resized = image.resize((variant_width, variant_height), Image.LANCZOS)
+                tmp_path = temp_path(variant_path)
+                resized.save(tmp_path, "WEBP", quality=WEBP_QUALITY)
+                os.replace(tmp_path, variant_path)
+            variants.append([variant_width, name])
+    return {"width": width, "height": height, "variants": variants, "resized": True}
+
+
+def load_image_index(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, "index.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_image_index(index: dict, cache_dir: str) -> None:
+    path = os.path.join(cache_dir, "index.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_processed(record: dict | None, cache_dir: str) -> bool:
+    if record is None or (Image is not None and not record["resized"]):
+        return False
+    return all(
+        os.path.exists(os.path.join(cache_dir, name)) for _, name in record["variants"]
+    )
+
+
+def process_images(
+    source_folder: str,
+    dest_folder: str | None = None,
+    cache_dir=IMAGE_CACHE_PATH,
+    jobs=1,
+    previous: dict[str, dict] | None = None,
+    verbose=True,
+    files=None,
+) -> dict[str, dict]:
+    # Returns the image attributes of every local image by its site URL.
+    # dest_folder None only builds the table, e.g. for a shard that does not
+    # write static files.
+    os.makedirs(cache_dir, exist_ok=True)
+    index = load_image_index(cache_dir)
+    if files is None:
+        files = scan_assets(source_folder, "")
+    images = [
+        (file.path, file.relative_path, file.digest())
+        for file in files
+        if file.relative_path.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+    # Identical images share their variants, so each digest is processed once.
+    pending = {}
+    for path, _, digest in images:
+        if digest not in pending and not is_processed(index.get(digest), cache_dir):
+            pending[digest] = path
+    if jobs == 1 or len(pending) < 2:
+        results = [
+            process_image(path, digest, cache_dir) for digest, path in pending.items()
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+            futures = [
+                pool.submit(process_image, path, digest, cache_dir)
+                for digest, path in pending.items()
+            ]
+            results = [future.result() for future in futures]
+    for (digest, path), record in zip(pending.items(), results):
+        index[digest] = record
+        logger.info(
+            "%s has been processed",
+            path,
+            extra={"event": "image", "variants": len(record["variants"])},
+        )
+        if verbose:
+            print(f"{path} has been processed")
+    save_image_index(index, cache_dir)
+
+    table = {}
+    for path, relative_path, digest in images:
+        record = index[digest]
+        if record["width"] is None:
+            continue
+        root, _ = os.path.splitext(relative_path)
+        attributes = {
+            "width": str(record["width"]),
+            "height": str(record["height"]),
+            "loading": "lazy",
+        }
+        srcset = []
+        for width, name in record["variants"]:
+            url = f"/{root}-{width}.{digest[:10]}.webp"
+            srcset.append(f"{url} {width}w")
+            if dest_folder is None:
+                continue
+            des_path = os.path.join(dest_folder, *url[1:].split("/"))
+            if not os.path.exists(des_path):
+                os.makedirs(os.path.dirname(des_path), exist_ok=True)
+                copy_file(os.path.join(cache_dir, name), des_path)
+                logger.info(
+                    "%s has been created", des_path, extra={"event": "image_variant"}
+                )
+        if srcset:
+            attributes["srcset"] = ", ".join(srcset)
+        table[f"/{relative_path}"] = attributes
+
+    if dest_folder is not None:
+        for url in variant_urls(previous or {}) - variant_urls(table):
+            des_path = os.path.join(dest_folder, *url[1:].split("/"))
+            if os.path.exists(des_path):
+                os.remove(des_path)
+            logger.info("%s has been removed", des_path, extra={"event": "remove"})
+    return table
+
+
+def variant_urls(table: dict[str, dict]) -> set[str]:
+    urls = set()
+    for attributes in table.values():
+        if "srcset" in attributes:
+            urls.update(item.split(" ")[0] for item in attributes["srcset"].split(", "))
+    return urls
+
+
+def configure_images(table: dict[str, dict] | None) -> None:
+    global _image_table, _image_table_digest
+    _image_table = table or {}
+    _image_table_digest = ""
+    if _image_table:
+        encoded = json.dumps(_image_table, sort_keys=True).encode("utf-8")
+        _image_table_digest = hash_bytes(encoded)
+
+
+def get_image_table() -> dict[str, dict]:
+    return _image_table
+
+
+def image_table_digest() -> str:
+    return _image_table_digest
+
+
+def image_attributes(url: str) -> dict:
+    return _image_table.get(url, {})
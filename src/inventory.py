@@ -0,0 +1,151 @@
+import fnmatch
+import os
+
+from manifest import hash_file
+
+PAGE_PATTERNS = ("*.md", "*.markdown")
+IGNORE_PATTERNS = (".DS_Store", ".#*", "*~", "*.swp")
+
+
+class SiteFile:
+    __slots__ = ("kind", "path", "relative_path", "dest_path", "stat", "_digest")
+
+    def __init__(
+        self,
+        kind: str,
+        path: str,
+        relative_path: str,
+        dest_path: str,
+        stat: os.stat_result,
+    ):
+        self.kind = kind
+        self.path = path
+        self.relative_path = relative_path
+        self.dest_path = dest_path
+        self.stat = stat
+        self._digest = None
+
+    @property
+    def size(self) -> int:
+        return self.stat.st_size
+
+    @property
+    def mtime(self) -> int:
+        return self.stat.st_mtime_ns
+
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hash_file(self.path)
+        return self._digest
+
+    def __repr__(self):
+        return f"<SiteFile {self.kind} {self.relative_path} -> {self.dest_path}>"
+
+
+class Inventory:
+    def __init__(self, pages: list[SiteFile], assets: list[SiteFile]):
+        self.pages = pages
+        self.assets = assets
+
+    def __repr__(self):
+        return f"<Inventory {len(self.pages)} pages {len(self.assets)} assets>"
+
+
+def matches(relative_path: str, patterns) -> bool:
+    # Patterns without a slash match the file name in any folder, the others
+    # match the whole path relative to the scanned folder.
+    name = relative_path.rpartition("/")[2]
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(relative_path if "/" in pattern else name, pattern):
+            return True
+    return False
+
+
+def ignored(relative_path: str, ignore=IGNORE_PATTERNS) -> bool:
+    # Like scan_tree, a file is also ignored when any folder above it is.
+    parts = relative_path.split("/")
+    return any(
+        matches("/".join(parts[:end]), ignore) for end in range(1, len(parts) + 1)
+    )
+
+
+def scan_tree(root: str, ignore=IGNORE_PATTERNS):
+    # Yields (path, relative_path, stat) for every file below root, sorted and
+    # depth first. relative_path always uses "/". Ignored folders are not
+    # entered at all.
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        # Files may disappear while a watched tree is scanned.
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except FileNotFoundError:
+            continue
+        folders = []
+        for entry in entries:
+            relative_path = prefix + entry.name
+            if matches(relative_path, ignore):
+                continue
+            try:
+                if entry.is_dir():
+                    folders.append((entry.path, relative_path + "/"))
+                elif entry.is_file():
+                    yield entry.path, relative_path, entry.stat()
+            except FileNotFoundError:
+                continue
+        stack.extend(reversed(folders))
+
+
+def page_dest(relative_path: str, dest_dir_path: str) -> str:
+    root, _ = os.path.splitext(relative_path)
+    return os.path.join(dest_dir_path, *root.split("/")) + ".html"
+
+
+def asset_dest(relative_path: str, dest_dir_path: str) -> str:
+    return os.path.join(dest_dir_path, *relative_path.split("/"))
+
+
+def scan_pages(
+    content_folder: str,
+    dest_dir_path: str,
+    include=PAGE_PATTERNS,
+    ignore=IGNORE_PATTERNS,
+) -> list[SiteFile]:
+    pages = []
+    for path, relative_path, stat in scan_tree(content_folder, ignore):
+        if matches(relative_path, include):
+            dest_path = page_dest(relative_path, dest_dir_path)
+            pages.append(SiteFile("page", path, relative_path, dest_path, stat))
+    return pages
+
+
+def scan_assets(
+    source_folder: str, dest_dir_path: str, ignore=IGNORE_PATTERNS
+) -> list[SiteFile]:
+    assets = []
+    for path, relative_path, stat in scan_tree(source_folder, ignore):
+        dest_path = asset_dest(relative_path, dest_dir_path)
+        assets.append(SiteFile("asset", path, relative_path, dest_path, stat))
+    return assets
+
+
+def build_inventory(
+    content_folder: str,
+    source_folder: str | None,
+    dest_dir_path: str,
+    include=PAGE_PATTERNS,
+    ignore=IGNORE_PATTERNS,
+) -> Inventory:
+    pages = scan_pages(content_folder, dest_dir_path, include, ignore)
+    assets = []
+    if source_folder is not None and os.path.isdir(source_folder):
+        assets = scan_assets(source_folder, dest_dir_path, ignore)
+    asset_paths = {asset.dest_path: asset.path for asset in assets}
+    for page in pages:
+        if page.dest_path in asset_paths:
+            raise ValueError(
+                f"{page.dest_path} is generated by {page.path} "
+                f"and copied from {asset_paths[page.dest_path]}"
+            )
+    return Inventory(pages, assets)
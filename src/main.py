@@ -1,115 +1,1126 @@
+import argparse
+import itertools
 import logging
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 
-from markdown import extract_title, markdown_to_html_node
+from buildlog import (
+    LOG_PATH,
+    configure_logging,
+    configure_worker_logging,
+    worker_log_queue,
+)
+from cache import (
+    BLOCK_CACHE_PATH,
+    configure_block_cache,
+    get_block_cache,
+)
+from compress import compress_outputs
+from fragments import (
+    FRAGMENT_FOLDER,
+    fragment_key,
+    fragment_path,
+    load_fragment,
+    remove_unused_fragments,
+    write_fragment,
+)
+from fingerprint import (
+    asset_map_digest,
+    build_asset_map,
+    configure_asset_map,
+    get_asset_map,
+    write_fingerprinted,
+)
+from images import (
+    configure_images,
+    get_image_table,
+    image_table_digest,
+    process_images,
+)
+from inventory import (
+    IGNORE_PATTERNS,
+    PAGE_PATTERNS,
+    build_inventory,
+    ignored,
+    scan_pages,
+)
+from manifest import (
+    MANIFEST_PATH,
+    hash_bytes,
+    is_stale,
+    load_manifest,
+    page_entry,
+    save_manifest,
+)
+from markdown import StreamingDocument, extract_title
+from page import parse_front_matter, parse_page
+from pipeline import BackgroundWriter, prefetch, read_text, replace_file
+from search import RecordBuilder, write_search_index, write_sitemap
+from server import PAGE_CACHE_SIZE, SERVER_THREADS, serve_pages
+from shard import merge_manifests, parse_shard, shard_manifest_path, shard_of
+from sync import sync_tree
+from template import (
+    load_template,
+    loaded_template_sources,
+    template_path_for,
+)
+from tracing import (
+    PROFILE_PATH,
+    BuildProfiler,
+    get_build_summary,
+    reset_build_summary,
+    stage_timer,
+)
+from watch import watch
 
 SOURCE_PATH = os.getenv("SOURCE_PATH", "static")
 CONTENT_PATH = os.getenv("CONTENT_PATH", "content")
+INCREMENTAL = os.getenv("INCREMENTAL", "") not in ("", "0")
+STREAM_THRESHOLD = int(os.getenv("STREAM_THRESHOLD_MB") or "16") << 20
+PERSIST_BLOCK_CACHE = os.getenv("PERSIST_BLOCK_CACHE", "") not in ("", "0")
+VERBOSE = os.getenv("VERBOSE", "") not in ("", "0")
 
 logger = logging.getLogger(__name__)
 
 
-def main():
-    logging.basicConfig(filename=".log", level=logging.INFO)
-    logger.info("Starting")
-    clean_files_in_public()
-    copy_content_from_source()
-    generate_pages_recursive(CONTENT_PATH, "template.html", "public")
-    logger.info("Finished")
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the static site")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=INCREMENTAL,
+        help="only render pages whose inputs changed and never wipe public",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        default=os.getenv("CHECKSUM", "") not in ("", "0"),
+        help="compare static files of the same size by content, not mtime",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        default=os.getenv("HARDLINK", "") not in ("", "0"),
+        help="hardlink static files into public instead of copying them",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.getenv("JOBS") or "1",
+        help="number of processes used to render pages (0 uses every core)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="serve public, rebuild what changed and reload open pages",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="render pages when they are requested instead of writing public",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=os.getenv("PORT") or "8888",
+        help="port used by --watch and --serve",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.getenv("THREADS") or str(SERVER_THREADS),
+        metavar="N",
+        help="number of threads handling the requests of --serve",
+    )
+    parser.add_argument(
+        "--page-cache-mb",
+        type=int,
+        default=os.getenv("PAGE_CACHE_MB") or str(PAGE_CACHE_SIZE >> 20),
+        metavar="MB",
+        help="size of the rendered page cache of --serve",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=VERBOSE,
+        help="print every file that is written, not only the summary",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_PATH,
+        metavar="PATH",
+        help=f"time every stage of every page into a Chrome trace ({PROFILE_PATH})",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed after a profiled build",
+    )
+    parser.add_argument(
+        "--block-cache-mb",
+        type=int,
+        default=os.getenv("BLOCK_CACHE_MB") or "0",
+        metavar="MB",
+        help="size of the rendered block cache (0, the default, disables it)",
+    )
+    parser.add_argument(
+        "--persist-block-cache",
+        action="store_true",
+        default=PERSIST_BLOCK_CACHE,
+        help=f"keep the rendered block cache between builds in {BLOCK_CACHE_PATH}",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        default=os.getenv("MINIFY", "") not in ("", "0"),
+        help="collapse insignificant whitespace while the pages are written",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        default=os.getenv("FINGERPRINT", "") not in ("", "0"),
+        help="copy static assets to content hashed names and link to those",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        default=os.getenv("IMAGES", "") not in ("", "0"),
+        help="add width, height, lazy loading and resized WebP srcsets to images",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        default=os.getenv("COMPRESS", "") not in ("", "0"),
+        help="write .gz (and .br) siblings of the HTML, CSS and JS outputs",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="PATTERN",
+        help="content files that are pages (default: *.md and *.markdown)",
+    )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="skip matching content and static files, on top of editor files",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_argument,
+        default=os.getenv("SHARD") or None,
+        metavar="i/N",
+        help="only render the pages of shard i out of N (0 <= i < N)",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        nargs="+",
+        metavar="MANIFEST",
+        help="merge shard manifests into the build manifest and check collisions",
+    )
+    parser.add_argument(
+        "--sitemap",
+        default=os.getenv("SITEMAP_URL") or None,
+        metavar="BASE_URL",
+        help="write public/sitemap.xml with page URLs below BASE_URL",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        default=os.getenv("SEARCH_INDEX", "") not in ("", "0"),
+        help="write a sharded search index of the pages to public/search",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("--jobs must be 0 or a positive number")
+    if args.threads < 1:
+        parser.error("--threads must be a positive number")
+    if args.serve and args.watch:
+        parser.error("--serve renders every request from the sources, drop --watch")
+    args.include = tuple(args.include or PAGE_PATTERNS)
+    args.ignore = IGNORE_PATTERNS + tuple(args.ignore)
+    if args.compress and args.shard is not None:
+        parser.error("sharded builds are compressed by --merge-shards --compress")
+    return args
+
+
+def shard_argument(text: str) -> tuple[int, int]:
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        args.incremental = True
+    configure_logging(LOG_PATH)
+    logger.info("Starting", extra={"event": "start"})
+    profiler = BuildProfiler() if args.profile else None
+    summary = reset_build_summary()
+    stage = stage_timer(profiler, summary)
+    if args.serve:
+        configure_block_cache(args.block_cache_mb << 20)
+        serve_pages(
+            CONTENT_PATH,
+            SOURCE_PATH,
+            "template.html",
+            port=args.port,
+            threads=args.threads,
+            cache_bytes=args.page_cache_mb << 20,
+            minify=args.minify,
+            include=args.include,
+            ignore=args.ignore,
+        )
+        return
+    if args.merge_shards:
+        merged = merge_manifests(args.merge_shards)
+        shards = len(args.merge_shards)
+        print(f"Merged {len(merged['pages'])} pages from {shards} shards")
+        if args.sitemap or args.search_index:
+            records = {
+                dest_path: entry["record"]
+                for dest_path, entry in merged["pages"].items()
+                if "record" in entry
+            }
+            with stage("search", "public"):
+                write_site_index(records, "public", args.sitemap, args.search_index)
+        if args.compress:
+            with stage("compress", "public"):
+                precompress_outputs("public", jobs=args.jobs, verbose=args.verbose)
+        return
+    with stage("inventory", CONTENT_PATH):
+        inventory = build_inventory(
+            CONTENT_PATH, SOURCE_PATH, "public", args.include, args.ignore
+        )
+    if args.fingerprint:
+        with stage("fingerprint", SOURCE_PATH):
+            configure_asset_map(build_asset_map(SOURCE_PATH, inventory.assets))
+    manifest_path = MANIFEST_PATH
+    if args.shard is not None:
+        manifest_path = shard_manifest_path(args.shard)
+    # Shards may share the output folder, so only a full build cleans it.
+    if not args.incremental and args.shard is None:
+        with stage("clean", "public"):
+            clean_files_in_public(args.verbose)
+    # Static files are only copied by the first shard.
+    if args.shard is None or args.shard[0] == 0:
+        with stage("copy_static", SOURCE_PATH):
+            copy_content_from_source(
+                verbose=args.verbose,
+                sync=args.incremental or args.shard is not None,
+                manifest_path=manifest_path,
+                asset_map=get_asset_map(),
+                files=inventory.assets,
+                checksum=args.checksum,
+                link=args.hardlink,
+            )
+    if args.images:
+        with stage("images", SOURCE_PATH):
+            prepare_images(
+                manifest_path=manifest_path,
+                jobs=args.jobs,
+                sync=args.incremental or args.shard is not None,
+                write=args.shard is None or args.shard[0] == 0,
+                verbose=args.verbose,
+                files=inventory.assets,
+            )
+    block_cache_path = BLOCK_CACHE_PATH if args.persist_block_cache else None
+    configure_block_cache(args.block_cache_mb << 20, block_cache_path, render_salt())
+    records = {} if args.sitemap or args.search_index else None
+    with summary.stage("render"):
+        generate_pages_recursive(
+            CONTENT_PATH,
+            "template.html",
+            "public",
+            verbose=args.verbose,
+            incremental=args.incremental,
+            manifest_path=manifest_path,
+            jobs=args.jobs,
+            profiler=profiler,
+            block_cache_path=block_cache_path,
+            shard=args.shard,
+            minify=args.minify,
+            pages=inventory.pages,
+            records=records,
+        )
+    # A sharded build only has its own pages, --merge-shards writes the index.
+    if records is not None and args.shard is None:
+        with stage("search", "public"):
+            write_site_index(records, "public", args.sitemap, args.search_index)
+    if args.compress:
+        with stage("compress", "public"):
+            precompress_outputs(
+                "public",
+                manifest_path=manifest_path,
+                jobs=args.jobs,
+                incremental=args.incremental,
+                verbose=args.verbose,
+            )
+    cache = get_block_cache()
+    stats = None
+    if cache is not None:
+        if block_cache_path is not None:
+            cache.save(block_cache_path)
+        stats = cache.stats()
+    logger.info("Finished", extra={"event": "summary", **summary.fields(stats)})
+    print(summary.report(stats))
+    if profiler is not None:
+        profiler.write_trace(args.profile)
+        print(profiler.summary(args.profile_top))
+        print(f"Trace written to {args.profile}")
+    if args.watch:
+
+        def on_change(changed, removed):
+            rebuild_changed(
+                changed,
+                removed,
+                CONTENT_PATH,
+                SOURCE_PATH,
+                "template.html",
+                "public",
+                jobs=args.jobs,
+                verbose=args.verbose,
+                minify=args.minify,
+                fingerprint=args.fingerprint,
+                images=args.images,
+                include=args.include,
+                ignore=args.ignore,
+                sitemap=args.sitemap,
+                search_index=args.search_index,
+                checksum=args.checksum,
+                link=args.hardlink,
+            )
+            if args.compress:
+                precompress_outputs(
+                    "public", jobs=args.jobs, incremental=True, verbose=args.verbose
+                )
+
+        watch(
+            [CONTENT_PATH, SOURCE_PATH],
+            lambda: sorted(loaded_template_sources()),
+            on_change,
+            "public",
+            port=args.port,
+            ignore=args.ignore,
+        )
 
 
 def clean_files_in_public(verbose=True) -> None:
     shutil.rmtree("public")
     if verbose:
         print("public has been delated")
-    logger.info("public has been delated")
+    logger.info("%s has been deleted", "public", extra={"event": "clean"})
     os.makedirs("public")
     if verbose:
         print("public has been created")
-    logger.info("public has been created")
 
 
-def copy_content_from_source(source_folder=SOURCE_PATH, verbose=True) -> None:
+def copy_content_from_source(
+    source_folder=SOURCE_PATH,
+    verbose=True,
+    dest_folder="public",
+    sync=False,
+    manifest_path=MANIFEST_PATH,
+    asset_map=None,
+    files=None,
+    checksum=False,
+    link=False,
+) -> None:
     if not os.path.exists(source_folder):
         logger.error("no folder in source path")
         raise OSError("no folder in source path")
 
-    def recursion_copy(path, verbose=verbose):
-        if os.path.isfile(path):
-            des_path = path.replace(source_folder, "public")
-            shutil.copy(path, des_path)
-            logger.info(f"{des_path} has been created")
-            if verbose:
-                print(f"{des_path} has been created")
-            return
-        files = os.listdir(path)
-        for file in files:
-            src_path = os.path.join(path, file)
-            des_path = os.path.join(path.replace(source_folder, "public"), file)
-            if os.path.isdir(src_path):
-                if not os.path.exists(des_path):
-                    os.mkdir(des_path)
-                    logger.info(f"{des_path} has been created")
-                    if verbose:
-                        print(f"{des_path} has been created")
-            recursion_copy(src_path)
-
-    recursion_copy(source_folder)
+    if not sync:
+        sync_tree(
+            source_folder,
+            dest_folder,
+            checksum=checksum,
+            link=link,
+            verbose=verbose,
+            files=files,
+        )
+        if asset_map:
+            write_fingerprinted(source_folder, dest_folder, asset_map, verbose=verbose)
+        return
+    manifest = load_manifest(manifest_path)
+    manifest["assets"] = sync_tree(
+        source_folder,
+        dest_folder,
+        manifest["assets"],
+        checksum=checksum,
+        link=link,
+        verbose=verbose,
+        files=files,
+    )
+    if asset_map or manifest.get("fingerprints"):
+        write_fingerprinted(
+            source_folder,
+            dest_folder,
+            asset_map or {},
+            manifest.get("fingerprints"),
+            verbose=verbose,
+        )
+        manifest["fingerprints"] = asset_map or {}
+    save_manifest(manifest, manifest_path)
 
 
 def generate_page(
-    from_path: str, template_path: str, dest_path: str, verbose=True
-) -> None:
-    logger.info(
-        f"Generating page from {from_path} to {dest_path} using {template_path}"
-    )
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    verbose=True,
+    profiler=None,
+    markdown_content=None,
+    writer=None,
+    minify=False,
+    record=False,
+    fragment=None,
+) -> dict | None:
+    # With record the page's search record is collected from the nodes that
+    # are rendered anyway and returned. fragment is the path the rendered
+    # content and title are stored at for later template only rebuilds.
     if verbose:
         print(f"Generating page from {from_path} to {dest_path} using {template_path}")
 
-    with open(from_path, encoding="utf-8") as f:
-        markdown_content = f.read()
+    stage = stage_timer(profiler)
+    if markdown_content is None and os.path.getsize(from_path) >= STREAM_THRESHOLD:
+        meta, _ = read_front_matter(from_path)
+        if meta.get("draft"):
+            skip_draft(from_path, dest_path, verbose)
+            return None
+        page_record = generate_page_streaming(
+            from_path, template_path, dest_path, minify, record
+        )
+        page_written(from_path, dest_path, os.path.getsize(dest_path), verbose)
+        return page_record
+    if markdown_content is None:
+        with stage("read", from_path):
+            markdown_content = read_text(from_path)
 
-    with open(template_path, encoding="utf-8") as f:
-        template = f.read()
-
-    title = extract_title(markdown_content)
-    content = markdown_to_html_node(markdown_content).to_html()
+    with stage("parse", from_path):
+        page = parse_page(markdown_content, get_block_cache())
+    if page.draft:
+        skip_draft(from_path, dest_path, verbose)
+        return None
+    template = load_template(template_path_for(page.template, template_path))
+    title, content = page.title, page.content
+    page_record = None
+    if record:
+        builder = RecordBuilder()
+        builder.add(content)
+        page_record = builder.record(title, from_path, page.date)
+    if fragment is not None:
+        with stage("to_html", from_path):
+            content = "".join(content.iter_html(minify))
+        write_fragment(fragment, title, content)
+    if writer is not None:
+        values = {"Title": title, "Content": content}
+        writer.write(dest_path, template.render(values, minify))
+        # The background writer counts the bytes of its pages.
+        page_written(from_path, dest_path, None, verbose)
+        return page_record
     folders = os.path.dirname(dest_path)
-    if not os.path.exists(folders):
-        os.makedirs(folders)
-    html_content = template.replace("{{ Title }}", title).replace(
-        "{{ Content }}", content
-    )
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
-    f.close()
-    logger.info(f"{dest_path} Created")
+    if folders:
+        os.makedirs(folders, exist_ok=True)
+    if profiler is None:
+        with replace_file(dest_path) as f:
+            template.write_to(f, {"Title": title, "Content": content}, minify)
+    else:
+        # Profiled pages are serialized, filled and written as separate steps so
+        # every stage gets its own timing.
+        if fragment is None:
+            with stage("to_html", from_path):
+                content = "".join(content.iter_html(minify))
+        with stage("template", from_path):
+            values = {"Title": title, "Content": content}
+            html_content = template.render(values, minify)
+        with stage("write", from_path):
+            with replace_file(dest_path) as f:
+                f.write(html_content)
+    page_written(from_path, dest_path, os.path.getsize(dest_path), verbose)
+    return page_record
+
+
+def page_written(from_path: str, dest_path: str, size: int | None, verbose=True):
+    summary = get_build_summary()
+    summary.add("pages")
+    if size is not None:
+        summary.add("page_bytes", size)
+    logger.info(
+        "%s created",
+        dest_path,
+        extra={"event": "page", "source": from_path, "bytes": size},
+    )
     if verbose:
         print(f"{dest_path} Created")
 
 
+def read_lines(path: str, skip=0):
+    with open(path, encoding="utf-8") as f:
+        for line in itertools.islice(f, skip, None):
+            yield line[:-1] if line.endswith("\n") else line
+
+
+def read_front_matter(path: str) -> tuple[dict, int]:
+    lines = read_lines(path)
+    try:
+        return parse_front_matter(lines)
+    finally:
+        lines.close()
+
+
+def skip_draft(from_path: str, dest_path: str, verbose=True) -> None:
+    logger.info("%s is a draft", from_path, extra={"event": "draft"})
+    if verbose:
+        print(f"{from_path} is a draft")
+    if os.path.exists(dest_path):
+        remove_output(dest_path, verbose=verbose)
+
+
+def generate_page_streaming(
+    from_path: str, template_path: str, dest_path: str, minify=False, record=False
+) -> dict | None:
+    # Large sources are read twice line by line, once for the title and once
+    # while the HTML is written, so memory does not grow with the page size.
+    meta, skip = read_front_matter(from_path)
+    template = load_template(template_path_for(meta.get("template"), template_path))
+    title = meta.get("title") or extract_title(read_lines(from_path, skip))
+    folders = os.path.dirname(dest_path)
+    if folders:
+        os.makedirs(folders, exist_ok=True)
+    builder = RecordBuilder() if record else None
+    # The blocks of a huge page are not cached, they would only fill the
+    # block cache with entries no other page shares.
+    content = StreamingDocument(
+        read_lines(from_path, skip),
+        observer=builder.add if builder is not None else None,
+    )
+    with replace_file(dest_path) as f:
+        template.write_to(f, {"Title": title, "Content": content}, minify)
+    if builder is not None:
+        return builder.record(title, from_path, meta.get("date"))
+    return None
+
+
+def render_page_task(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    verbose=True,
+    profile=False,
+    worker=False,
+    collect_cache=False,
+    minify=False,
+    record=False,
+    fragment=None,
+) -> dict:
+    result = {}
+    cache = get_block_cache()
+    if worker and cache is not None:
+        before = cache.stats()
+    if worker:
+        counts = dict(get_build_summary().counts)
+    if profile:
+        profiler = BuildProfiler()
+        with profiler.page(from_path):
+            page_record = generate_page(
+                from_path,
+                template_path,
+                dest_path,
+                verbose,
+                profiler,
+                minify=minify,
+                record=record,
+                fragment=fragment,
+            )
+        result["events"] = profiler.events
+        result["pages"] = profiler.pages
+    else:
+        page_record = generate_page(
+            from_path,
+            template_path,
+            dest_path,
+            verbose,
+            minify=minify,
+            record=record,
+            fragment=fragment,
+        )
+    if page_record is not None:
+        result["record"] = page_record
+    if worker:
+        after = get_build_summary().counts
+        result["summary"] = {name: after[name] - counts[name] for name in counts}
+    if worker and cache is not None:
+        after = cache.stats()
+        result["cache_stats"] = {
+            name: after[name] - before[name] for name in ("hits", "misses", "evictions")
+        }
+        if collect_cache:
+            result["cache_entries"] = cache.take_new_entries()
+    return result
+
+
+def merge_task_result(
+    result: dict, profiler=None, dest_path=None, records=None
+) -> None:
+    if records is not None and "record" in result:
+        records[dest_path] = result["record"]
+    if "summary" in result:
+        get_build_summary().merge(result["summary"])
+    if profiler is not None and "events" in result:
+        profiler.merge(result["events"], result["pages"])
+    cache = get_block_cache()
+    if cache is not None and "cache_stats" in result:
+        cache.add_stats(result["cache_stats"])
+        for key, html in result.get("cache_entries", ()):
+            cache.put(key, html)
+
+
+def init_worker(
+    block_cache_size: int,
+    block_cache_path: str | None,
+    asset_map: dict,
+    image_table: dict,
+    log_queue=None,
+) -> None:
+    configure_worker_logging(log_queue)
+    configure_asset_map(asset_map)
+    configure_images(image_table)
+    if get_block_cache() is None:
+        configure_block_cache(block_cache_size, block_cache_path, render_salt())
+
+
+def content_relative_path(path: str, dir_path_content: str) -> str:
+    return os.path.relpath(path, dir_path_content).replace(os.sep, "/")
+
+
+def render_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    verbose=True,
+    jobs=1,
+    profiler=None,
+    block_cache_path=None,
+    minify=False,
+    records=None,
+    fragments=None,
+) -> None:
+    # records, when given, is filled with the search record of every page by
+    # its output path. fragments maps output paths to the fragment files
+    # their content is stored in.
+    record = records is not None
+    fragments = fragments or {}
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    profile = profiler is not None
+    if jobs == 1 and len(pages) > 1 and not profile:
+        # Reads of the next sources and writes of finished pages overlap with
+        # rendering on a small thread pool. Pages big enough to be streamed
+        # are left out of the prefetch.
+        streamed = [p for p in pages if os.path.getsize(p[0]) >= STREAM_THRESHOLD]
+        for from_path, dest_path in streamed:
+            page_record = generate_page(
+                from_path,
+                template_path,
+                dest_path,
+                verbose,
+                minify=minify,
+                record=record,
+                fragment=fragments.get(dest_path),
+            )
+            if record:
+                records[dest_path] = page_record
+        pages = [p for p in pages if os.path.getsize(p[0]) < STREAM_THRESHOLD]
+        sources = prefetch(from_path for from_path, _ in pages)
+        with BackgroundWriter() as writer:
+            for (from_path, dest_path), (_, markdown_content) in zip(pages, sources):
+                page_record = generate_page(
+                    from_path,
+                    template_path,
+                    dest_path,
+                    verbose,
+                    markdown_content=markdown_content,
+                    writer=writer,
+                    minify=minify,
+                    record=record,
+                    fragment=fragments.get(dest_path),
+                )
+                if record:
+                    records[dest_path] = page_record
+        get_build_summary().add("page_bytes", writer.bytes_written)
+        return
+    if jobs == 1 or len(pages) < 2:
+        for from_path, dest_path in pages:
+            result = render_page_task(
+                from_path,
+                template_path,
+                dest_path,
+                verbose,
+                profile,
+                minify=minify,
+                record=record,
+                fragment=fragments.get(dest_path),
+            )
+            merge_task_result(result, profiler, dest_path, records)
+        return
+
+    cache = get_block_cache()
+    block_cache_size = cache.max_bytes if cache is not None else 0
+    # Largest pages first so a huge page never ends up alone at the tail.
+    pages = sorted(pages, key=lambda page: os.path.getsize(page[0]), reverse=True)
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(pages)),
+        initializer=init_worker,
+        initargs=(
+            block_cache_size,
+            block_cache_path,
+            get_asset_map(),
+            get_image_table(),
+            worker_log_queue(),
+        ),
+    ) as pool:
+        futures = [
+            pool.submit(
+                render_page_task,
+                from_path,
+                template_path,
+                dest_path,
+                verbose,
+                profile,
+                True,
+                block_cache_path is not None,
+                minify,
+                record,
+                fragments.get(dest_path),
+            )
+            for from_path, dest_path in pages
+        ]
+        for (_, dest_path), future in zip(pages, futures):
+            merge_task_result(future.result(), profiler, dest_path, records)
+
+
 def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str, verbose=True
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    verbose=True,
+    incremental=False,
+    manifest_path=MANIFEST_PATH,
+    jobs=1,
+    profiler=None,
+    block_cache_path=None,
+    shard=None,
+    minify=False,
+    pages=None,
+    records=None,
 ) -> None:
     if not os.path.exists(dir_path_content):
         logger.error("no folder in source path")
         raise OSError("no folder in source path")
 
-    def recursion_copy(path, verbose=verbose):
-        if os.path.isfile(path):
-            des_path = path.replace(dir_path_content, dest_dir_path)
-            path_no_extencion = des_path.split(".")[:-1]
-            path_no_extencion.append("html")
-            html_path = ".".join(path_no_extencion)
-            generate_page(path, template_path, html_path)
-            return
-        files = os.listdir(path)
-        for file in files:
-            src_path = os.path.join(path, file)
-            recursion_copy(src_path)
-
-    recursion_copy(dir_path_content)
+    # pages are the SiteFiles of the build inventory, when there is one.
+    if pages is None:
+        pages = scan_pages(dir_path_content, dest_dir_path)
+    if shard is not None:
+        index, count = shard
+        pages = [page for page in pages if shard_of(page.relative_path, count) == index]
+    if not incremental and shard is None:
+        render_pages(
+            [(page.path, page.dest_path) for page in pages],
+            template_path,
+            verbose,
+            jobs,
+            profiler,
+            block_cache_path,
+            minify,
+            records,
+        )
+        return
+
+    # Sharded builds always record a manifest so the shards can be merged.
+    manifest = load_manifest(manifest_path)
+    old_pages = manifest["pages"] if incremental else {}
+    manifest["pages"] = {}
+    if shard is not None:
+        manifest["shard"] = list(shard)
+    stale_pages = []
+    # Incremental builds store the rendered content of every page, so pages
+    # whose markdown did not change are only spliced into a new template.
+    fragments = {}
+    spliced_pages = []
+    fragment_keys = set()
+    written_keys = set()
+    fragment_folder = os.path.join(os.path.dirname(manifest_path), FRAGMENT_FOLDER)
+    content_salt = ("minify " if minify else "") + render_salt()
+    for page in pages:
+        from_path, dest_path = page.path, page.dest_path
+        if dest_path in manifest["pages"]:
+            source = manifest["pages"][dest_path]["source"]
+            raise ValueError(f"{dest_path} is generated by {source} and {from_path}")
+        entry = old_pages.get(dest_path)
+        # Sources whose size and mtime did not change keep their recorded hash
+        # and template, without being opened.
+        if (
+            entry is not None
+            and entry.get("source") == from_path
+            and entry.get("size") == page.size
+            and entry.get("mtime") == page.mtime
+            and "template" in entry
+        ):
+            source_hash = entry["source_hash"]
+            template_name = entry["template"]
+        else:
+            source_hash = page.digest()
+            template_name = read_front_matter(from_path)[0].get("template")
+        template = load_template(template_path_for(template_name, template_path))
+        template_hash = output_hash(template, minify)
+        key = fragment_key(source_hash, content_salt)
+        fragment_keys.add(key)
+        fragment = fragment_path(key, fragment_folder)
+        # Search records are kept in the manifest, so unchanged pages reuse
+        # theirs and merged shards still have every page's record.
+        has_record = records is None or (entry is not None and "record" in entry)
+        if not is_stale(entry, dest_path, source_hash, template_hash) and has_record:
+            if records is not None:
+                records[dest_path] = entry["record"]
+        elif (
+            incremental
+            and has_record
+            and entry is not None
+            and entry.get("source") == from_path
+            and entry.get("source_hash") == source_hash
+            and os.path.exists(fragment)
+        ):
+            spliced_pages.append((dest_path, template, fragment))
+            if records is not None:
+                records[dest_path] = entry["record"]
+        else:
+            stale_pages.append((from_path, dest_path))
+            # Pages with the same markdown share a fragment, written once.
+            if incremental and key not in written_keys:
+                fragments[dest_path] = fragment
+                written_keys.add(key)
+        manifest["pages"][dest_path] = page_entry(
+            from_path, source_hash, template_hash, page.size, page.mtime, template_name
+        )
+    splice_pages(spliced_pages, minify, verbose)
+    render_pages(
+        stale_pages,
+        template_path,
+        verbose,
+        jobs,
+        profiler,
+        block_cache_path,
+        minify,
+        records,
+        fragments,
+    )
+    # Shards share the fragment folder, so only a whole build prunes it.
+    if incremental and shard is None:
+        remove_unused_fragments(fragment_keys, fragment_folder)
+    if records is not None:
+        for dest_path, entry in manifest["pages"].items():
+            entry["record"] = records[dest_path]
+
+    for dest_path in old_pages.keys() - manifest["pages"].keys():
+        remove_output(dest_path, verbose=verbose)
+    save_manifest(manifest, manifest_path)
+
+
+def splice_pages(pages: list[tuple], minify=False, verbose=True) -> None:
+    # pages are (output path, template, fragment path). Neither the markdown
+    # nor the node tree is needed, only the stored content and title.
+    summary = get_build_summary()
+    fragments = prefetch(fragment for _, _, fragment in pages)
+    with BackgroundWriter() as writer:
+        for (dest_path, template, _), (fragment, text) in zip(pages, fragments):
+            title, content = load_fragment(text)
+            values = {"Title": title, "Content": content}
+            writer.write(dest_path, template.render(values, minify))
+            summary.add("pages")
+            logger.info(
+                "%s spliced", dest_path, extra={"event": "splice", "fragment": fragment}
+            )
+            if verbose:
+                print(f"{dest_path} Created")
+    summary.add("page_bytes", writer.bytes_written)
+
+
+def rebuild_changed(
+    changed: list[str],
+    removed: list[str],
+    dir_path_content: str,
+    source_folder: str,
+    template_path: str,
+    dest_dir_path: str,
+    jobs=1,
+    verbose=True,
+    minify=False,
+    fingerprint=False,
+    images=False,
+    include=PAGE_PATTERNS,
+    ignore=IGNORE_PATTERNS,
+    manifest_path=MANIFEST_PATH,
+    sitemap=None,
+    search_index=False,
+    checksum=False,
+    link=False,
+) -> None:
+    # Rebuilds go through the manifest like an --incremental build, so the
+    # next build starts from what watch mode wrote. The manifest decides which
+    # pages are rendered, changed only tells whether static files are synced.
+    content_prefix = os.path.join(dir_path_content, "")
+    source_prefix = os.path.join(source_folder, "")
+
+    def watched(path: str) -> bool:
+        for folder, prefix in (
+            (dir_path_content, content_prefix),
+            (source_folder, source_prefix),
+        ):
+            if path.startswith(prefix):
+                return not ignored(content_relative_path(path, folder), ignore)
+        return True
+
+    changed = [path for path in changed if watched(path)]
+    removed = [path for path in removed if watched(path)]
+    if not changed and not removed:
+        return
+    inventory = build_inventory(
+        dir_path_content, source_folder, dest_dir_path, include, ignore
+    )
+    previous_map = get_asset_map()
+    previous_table = get_image_table()
+    if any(path.startswith(source_prefix) for path in changed + removed):
+        if fingerprint:
+            configure_asset_map(build_asset_map(source_folder, inventory.assets))
+        copy_content_from_source(
+            source_folder,
+            verbose=verbose,
+            dest_folder=dest_dir_path,
+            sync=True,
+            manifest_path=manifest_path,
+            asset_map=get_asset_map(),
+            files=inventory.assets,
+            checksum=checksum,
+            link=link,
+        )
+        if images:
+            prepare_images(
+                source_folder,
+                dest_dir_path,
+                manifest_path,
+                jobs=jobs,
+                sync=True,
+                verbose=verbose,
+                files=inventory.assets,
+            )
+    cache = get_block_cache()
+    if cache is not None and (
+        get_asset_map() != previous_map or get_image_table() != previous_table
+    ):
+        cache.salt = render_salt()
+    records = {} if sitemap or search_index else None
+    generate_pages_recursive(
+        dir_path_content,
+        template_path,
+        dest_dir_path,
+        verbose=verbose,
+        incremental=True,
+        manifest_path=manifest_path,
+        jobs=jobs,
+        minify=minify,
+        pages=inventory.pages,
+        records=records,
+    )
+    if records is not None:
+        write_site_index(records, dest_dir_path, sitemap, search_index)
+
+
+def prepare_images(
+    source_folder=SOURCE_PATH,
+    dest_folder="public",
+    manifest_path=MANIFEST_PATH,
+    jobs=1,
+    sync=False,
+    write=True,
+    verbose=True,
+    files=None,
+) -> None:
+    manifest = load_manifest(manifest_path)
+    table = process_images(
+        source_folder,
+        dest_folder if write else None,
+        jobs=jobs,
+        previous=manifest.get("images") if sync else None,
+        verbose=verbose,
+        files=files,
+    )
+    configure_images(table)
+    if sync:
+        manifest["images"] = table
+        save_manifest(manifest, manifest_path)
+
+
+def precompress_outputs(
+    dest_dir_path: str,
+    manifest_path=MANIFEST_PATH,
+    jobs=1,
+    incremental=False,
+    verbose=True,
+) -> None:
+    # A full build starts from an empty public folder, so only incremental
+    # builds can reuse the compressed siblings of unchanged outputs.
+    manifest = load_manifest(manifest_path)
+    previous = manifest["compressed"] if incremental else None
+    manifest["compressed"] = compress_outputs(dest_dir_path, previous, jobs, verbose)
+    save_manifest(manifest, manifest_path)
+
+
+def write_site_index(
+    records: dict, dest_dir_path: str, base_url=None, search_index=False
+) -> None:
+    # Drafts have no record.
+    records = {path: record for path, record in records.items() if record}
+    if base_url:
+        path = write_sitemap(records, dest_dir_path, base_url)
+        logger.info("%s has been created", path, extra={"event": "sitemap"})
+    if search_index:
+        path = write_search_index(records, dest_dir_path)
+        logger.info("%s has been created", path, extra={"event": "search_index"})
+
+
+def render_salt() -> str:
+    # Build wide inputs of the rendered HTML besides the markdown.
+    return asset_map_digest() + image_table_digest()
+
+
+def output_hash(template, minify=False) -> str:
+    # Everything besides the markdown that changes a page's HTML.
+    options = [template.digest]
+    if minify:
+        options.append("minify")
+    if render_salt():
+        options.append(render_salt())
+    if len(options) == 1:
+        return template.digest
+    return hash_bytes(" ".join(options).encode("utf-8"))
+
+
+def remove_output(dest_path: str, verbose=True) -> None:
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    logger.info("%s has been removed", dest_path, extra={"event": "remove"})
+    if verbose:
+        print(f"{dest_path} has been removed")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+
+GENERATOR_VERSION = "1"
+MANIFEST_PATH = os.path.join(".cache", "manifest.json")
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def empty_manifest() -> dict:
+    return {"version": GENERATOR_VERSION, "pages": {}, "assets": {}, "compressed": {}}
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    if not os.path.exists(path):
+        return empty_manifest()
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+    if manifest.get("version") != GENERATOR_VERSION:
+        return empty_manifest()
+    return {**empty_manifest(), **manifest}
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH) -> None:
+    folders = os.path.dirname(path)
+    if folders and not os.path.exists(folders):
+        os.makedirs(folders)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def page_entry(
+    source: str,
+    source_hash: str,
+    template_hash: str,
+    size=None,
+    mtime=None,
+    template=None,
+) -> dict:
+    entry = {
+        "source": source,
+        "source_hash": source_hash,
+        "template_hash": template_hash,
+        "version": GENERATOR_VERSION,
+    }
+    if size is not None:
+        entry["size"] = size
+        entry["mtime"] = mtime
+        # The template named in the front matter, None for the default one.
+        entry["template"] = template
+    return entry
+
+
+def is_stale(
+    entry: dict | None, dest: str, source_hash: str, template_hash: str
+) -> bool:
+    if entry is None or not os.path.exists(dest):
+        return True
+    return (
+        entry.get("source_hash") != source_hash
+        or entry.get("template_hash") != template_hash
+        or entry.get("version") != GENERATOR_VERSION
+    )
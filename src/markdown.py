@@ -1,4 +1,9 @@
+import re
+from typing import Iterable, Iterator
+
+from fingerprint import asset_url
 from htmlnode import HTMLNode, LeafNode, ParentNode
+from images import image_attributes
 from textnode import text_node_to_html_node, text_to_textnodes
 
 block_type_code = "code"
@@ -9,56 +14,129 @@ block_type_ordered_list = "ordered_list"
 block_type_paragraph = "paragraph"
 
 
+heading_re = re.compile(r"#{1,6} ")
+
+
+def scan_blocks(lines: Iterable[str]) -> Iterator[tuple[str, tuple[int, int]]]:
+    block_type = None
+    start = 0
+    marker = ""
+    number = 0
+    end = 0
+    for end, line in enumerate(lines):
+        if block_type == block_type_code:
+            if line.startswith("```"):
+                yield block_type, (start, end + 1)
+                block_type = None
+            continue
+        if not line.strip():
+            if block_type is not None:
+                yield block_type, (start, end)
+                block_type = None
+            continue
+        if block_type is None:
+            start = end
+            number = 1
+            if line.startswith("```"):
+                # A fence closed on its own line is a whole code block.
+                if len(line) > 5 and line.endswith("```"):
+                    yield block_type_code, (start, end + 1)
+                else:
+                    block_type = block_type_code
+            elif heading_re.match(line):
+                block_type = block_type_heading
+            elif line.startswith("> "):
+                block_type = block_type_quote
+            elif line.startswith("* ") or line.startswith("- "):
+                block_type = block_type_unordered_list
+                marker = line[:2]
+            elif line.startswith("1. "):
+                block_type = block_type_ordered_list
+            else:
+                block_type = block_type_paragraph
+            continue
+        if block_type == block_type_unordered_list:
+            if not line.startswith(marker):
+                block_type = block_type_paragraph
+        elif block_type == block_type_ordered_list:
+            number += 1
+            if not line.startswith(f"{number}. "):
+                block_type = block_type_paragraph
+    if block_type is not None:
+        yield block_type, (start, end + 1)
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    if isinstance(lines, list):
+        for block_type, (start, end) in scan_blocks(lines):
+            yield block_type, "\n".join(lines[start:end])
+        return
+
+    # Streaming form of scan_blocks: only the lines of the current block are
+    # kept, so any line iterator (an open file) is consumed in constant memory.
+    buffer: list[str] = []
+    offset = 0
+
+    def buffered():
+        for line in lines:
+            buffer.append(line)
+            yield line
+
+    for block_type, (start, end) in scan_blocks(buffered()):
+        yield block_type, "\n".join(buffer[start - offset : end - offset])
+        del buffer[: end - offset]
+        offset = end
+
+
+def block_to_html_nodes(block: str, block_type: str, cache=None) -> list[HTMLNode]:
+    if cache is None:
+        return helper_block_to_html(block, block_type)
+    key = cache.key(block_type, block, cache.salt)
+    html = cache.get(key)
+    if html is None:
+        nodes = helper_block_to_html(block, block_type)
+        html = "".join(node.to_html() for node in nodes)
+        cache.put(key, html)
+    return [LeafNode(None, html)]
+
+
+def iter_html_nodes(lines: Iterable[str], cache=None) -> Iterator[HTMLNode]:
+    for block_type, block in iter_blocks(lines):
+        yield from block_to_html_nodes(block, block_type, cache)
+
+
+class StreamingDocument:
+    def __init__(self, lines: Iterable[str], cache=None, observer=None):
+        self.lines = lines
+        self.cache = cache
+        # Called with every block node before it is written.
+        self.observer = observer
+
+    def iter_html(self, minify=False):
+        yield "<div>"
+        for node in iter_html_nodes(self.lines, self.cache):
+            if self.observer is not None:
+                self.observer(node)
+            yield from node.iter_html(minify)
+        yield "</div>"
+
+    def write_to(self, fp, minify=False) -> None:
+        fp.writelines(self.iter_html(minify))
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
-    blocks = []
-    paragraphs = markdown.split("\n\n")
-    for block in paragraphs:
-        if block:
-            lines_in_block = block.split("\n")
-            filter_lines = filter(lambda x: True if x else False, lines_in_block)
-            blocks.append("\n".join(list(filter_lines)))
-    return blocks
+    lines = markdown.split("\n")
+    return ["\n".join(lines[start:end]) for _, (start, end) in scan_blocks(lines)]
 
 
 def block_to_block_type(markdown: str) -> str:
-    string_markdown_list = list(markdown)
-    markdown_line = markdown.split("\n")
-    if (
-        "".join(string_markdown_list[:3]) == "```"
-        and "".join(string_markdown_list[-3:]) == "```"
-    ):
-        return block_type_code
-    elif "# " in "".join(string_markdown_list[:7]):
-        return block_type_heading
-    elif markdown.startswith("> "):
-        return block_type_quote
-    elif markdown.startswith("* "):
-        for line in markdown_line:
-            if not line.startswith("* "):
-                return block_type_paragraph
-        return block_type_unordered_list
-    elif markdown.startswith("- "):
-        for line in markdown_line:
-            if not line.startswith("- "):
-                return block_type_paragraph
-        return block_type_unordered_list
-    elif markdown.startswith("1. "):
-        number = 1
-        for line in markdown_line:
-            if not line.startswith(f"{number}. "):
-                return block_type_paragraph
-            number += 1
-        return block_type_ordered_list
+    for block_type, _ in scan_blocks(markdown.split("\n")):
+        return block_type
     return block_type_paragraph
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
-    blocks = markdown_to_blocks(markdown)
-    html_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        nodes = helper_block_to_html(block, block_type)
-        html_nodes.extend(nodes)
+def markdown_to_html_node(markdown: str, cache=None) -> HTMLNode:
+    html_nodes = list(iter_html_nodes(markdown.split("\n"), cache))
     return ParentNode(tag="div", children=html_nodes)
 
 
@@ -66,7 +144,7 @@ def text_to_children(text: str) -> list[ParentNode | LeafNode]:
     text_nodes = text_to_textnodes(text)
     html_nodes: list[ParentNode | LeafNode] = []
     for node in text_nodes:
-        html_nodes.append(text_node_to_html_node(node))
+        html_nodes.append(text_node_to_html_node(node, asset_url, image_attributes))
     return html_nodes
 
 
@@ -130,14 +208,18 @@ def helper_block_to_quote(block: str) -> ParentNode:
 
 
 def helper_block_to_code(block: str) -> ParentNode:
-    code_block = block.split("\n")[1:-1]
+    if "\n" not in block and len(block) > 5 and block.endswith("```"):
+        return ParentNode("pre", [LeafNode("code", block[3:-3])])
+    code_block = block.split("\n")[1:]
+    if code_block and code_block[-1].startswith("```"):
+        code_block.pop()
     return ParentNode("pre", [LeafNode("code", "\n".join(code_block))])
 
 
-def extract_title(markdown: str) -> str:
-    blocks = markdown_to_blocks(markdown)
-    for block in blocks:
-        if block_to_block_type(block) == block_type_heading and block.startswith("# "):
+def extract_title(markdown: str | Iterable[str]) -> str:
+    lines = markdown.split("\n") if isinstance(markdown, str) else markdown
+    for block_type, block in iter_blocks(lines):
+        if block_type == block_type_heading and block.startswith("# "):
             title = block.lstrip("# ")
             return title
     raise ValueError("No title found")
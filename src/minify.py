@@ -0,0 +1,68 @@
+import re
+
+# Elements whose text is rendered as written. They are copied byte for byte.
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+# Whitespace next to these tags never renders, so templates drop it entirely.
+BLOCK_TAGS = (
+    "html|head|body|title|meta|link|base|article|section|nav|header|footer|main"
+    "|aside|div|p|h[1-6]|ul|ol|li|blockquote|pre|table|thead|tbody|tr|th|td|hr|br"
+)
+
+whitespace_re = re.compile(r"[ \t\n\r\f]+")
+preserved_re = re.compile(
+    r"<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I
+)
+block_space_re = re.compile(
+    rf" ?(<!doctype[^>]*>|</?(?:{BLOCK_TAGS})\b[^>]*>) ?", re.I
+)
+
+
+def has_whitespace_run(text: str) -> bool:
+    # Most rendered text has nothing to collapse, and these scans are much
+    # cheaper than running the regex.
+    return "\n" in text or "  " in text or "\t" in text or "\r" in text or "\f" in text
+
+
+def collapse_whitespace(text: str) -> str:
+    if has_whitespace_run(text):
+        return whitespace_re.sub(" ", text)
+    return text
+
+
+def _outside_preserved(html: str, minify, strip_blocks=False) -> str:
+    if "<" not in html:
+        return minify(html)
+    result = []
+    position = 0
+    after_block = False
+    for match in preserved_re.finditer(html):
+        text = minify(html[position : match.start()])
+        # <pre> is a block too, but its tags are inside the preserved match.
+        is_block = match.group(1).lower() == "pre"
+        if strip_blocks and after_block:
+            text = text.removeprefix(" ")
+        if strip_blocks and is_block:
+            text = text.removesuffix(" ")
+        result.append(text)
+        result.append(match.group(0))
+        position = match.end()
+        after_block = is_block
+    text = minify(html[position:])
+    if strip_blocks and after_block:
+        text = text.removeprefix(" ")
+    result.append(text)
+    return "".join(result)
+
+
+def minify_fragment(html: str) -> str:
+    if not has_whitespace_run(html):
+        return html
+    return _outside_preserved(html, collapse_whitespace)
+
+
+def minify_markup(html: str) -> str:
+    return block_space_re.sub(r"\1", whitespace_re.sub(" ", html))
+
+
+def minify_html(html: str) -> str:
+    return _outside_preserved(html, minify_markup, strip_blocks=True)
@@ -0,0 +1,103 @@
+import datetime
+from typing import Iterable
+
+from htmlnode import HTMLNode, ParentNode
+from markdown import block_to_html_nodes, block_type_heading, iter_blocks
+from template import template_directive
+
+FRONT_MATTER_FENCE = "---"
+
+
+class Page:
+    __slots__ = ("title", "meta", "outline", "content")
+
+    def __init__(
+        self,
+        title: str,
+        meta: dict,
+        outline: list[tuple[int, str]],
+        content: HTMLNode,
+    ):
+        self.title = title
+        self.meta = meta
+        # (level, text) of every heading in document order.
+        self.outline = outline
+        self.content = content
+
+    @property
+    def template(self) -> str | None:
+        return self.meta.get("template")
+
+    @property
+    def draft(self) -> bool:
+        return self.meta.get("draft", False)
+
+    @property
+    def date(self) -> str | None:
+        return self.meta.get("date")
+
+    def __repr__(self):
+        return f"<Page {self.title!r} {len(self.outline)} headings>"
+
+
+def parse_value(value: str) -> str | bool:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value in ("true", "false"):
+        return value == "true"
+    return value
+
+
+def parse_front_matter(lines: Iterable[str]) -> tuple[dict, int]:
+    # Returns the metadata and the number of lines it takes. Only those lines
+    # are consumed, so this also works on the line iterator of a huge file.
+    # Besides a "---" fenced block of "key: value" lines, a first line
+    # <!-- template: post.html --> is still understood.
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, 0
+    name = template_directive(first)
+    if name is not None:
+        return {"template": name}, 1
+    if first.rstrip() != FRONT_MATTER_FENCE:
+        return {}, 0
+    meta = {}
+    for number, line in enumerate(lines, 2):
+        if line.rstrip() == FRONT_MATTER_FENCE:
+            check_front_matter(meta)
+            return meta, number
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator or not key.strip():
+            raise ValueError(f"invalid front matter line {number}: {line!r}")
+        meta[key.strip()] = parse_value(value.strip())
+    raise ValueError(f"front matter is not closed by {FRONT_MATTER_FENCE}")
+
+
+def check_front_matter(meta: dict) -> None:
+    if not isinstance(meta.get("draft", False), bool):
+        raise ValueError(f"draft must be true or false, not {meta['draft']!r}")
+    if "date" in meta:
+        meta["date"] = datetime.date.fromisoformat(str(meta["date"])).isoformat()
+
+
+def parse_page(markdown: str, cache=None) -> Page:
+    # One pass over the blocks builds the node tree, the title and the
+    # outline together.
+    lines = markdown.split("\n")
+    meta, skip = parse_front_matter(lines)
+    title = meta.get("title")
+    outline = []
+    children = []
+    for block_type, block in iter_blocks(lines[skip:]):
+        if block_type == block_type_heading:
+            marks, _, text = block.partition(" ")
+            outline.append((len(marks), text))
+            if title is None and marks == "#":
+                title = block.lstrip("# ")
+        children.extend(block_to_html_nodes(block, block_type, cache))
+    if title is None:
+        raise ValueError("No title found")
+    return Page(title, meta, outline, ParentNode("div", children))
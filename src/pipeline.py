@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+IO_THREADS = 4
+PREFETCH_FILES = 16
+PENDING_WRITE_BYTES = 64 * 1024 * 1024
+
+
+def read_text(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def temp_path(path: str) -> str:
+    # Unique per process and thread, so writers of the same file never share
+    # a temp file.
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def replace_file(path: str, mode="w", encoding="utf-8"):
+    # The file is written next to path and replaces it once complete, so a
+    # path that is a hardlink (e.g. to a static file) is never written through.
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def prefetch(paths, max_ahead=PREFETCH_FILES, threads=IO_THREADS):
+    # Yields (path, text) in order while up to max_ahead following files are
+    # already being read on the thread pool.
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        paths = iter(paths)
+        for path in paths:
+            pending.append((path, pool.submit(read_text, path)))
+            if len(pending) >= max_ahead:
+                break
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(read_text, next_path)))
+            yield path, future.result()
+
+
+class BackgroundWriter:
+    def __init__(self, max_pending_bytes=PENDING_WRITE_BYTES, threads=IO_THREADS):
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes = 0
+        self.bytes_written = 0
+        self.condition = threading.Condition()
+        self.errors = []
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def write(self, path: str, text: str) -> None:
+        size = len(text)
+        with self.condition:
+            # A page larger than the whole budget still goes through once the
+            # queue is empty, so a huge page can not block forever.
+            self.condition.wait_for(
+                lambda: self.pending_bytes == 0
+                or self.pending_bytes + size <= self.max_pending_bytes
+            )
+            self.raise_errors()
+            self.pending_bytes += size
+        self.pool.submit(self._write, path, text, size)
+
+    def _write(self, path: str, text: str, size: int) -> None:
+        try:
+            folders = os.path.dirname(path)
+            if folders:
+                os.makedirs(folders, exist_ok=True)
+            with replace_file(path) as f:
+                f.write(text)
+                written = f.tell()
+            with self.condition:
+                self.bytes_written += written
+        except Exception as e:
+            with self.condition:
+                self.errors.append(e)
+        finally:
+            with self.condition:
+                self.pending_bytes -= size
+                self.condition.notify_all()
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            raise self.errors[0]
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+        self.raise_errors()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
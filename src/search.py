@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+from xml.sax.saxutils import escape
+
+from htmlnode import HTMLNode, ParentNode
+
+SNIPPET_LENGTH = 200
+TITLE_WEIGHT = 10
+HEADING_WEIGHT = 5
+SEARCH_FOLDER = "search"
+
+heading_tags = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+block_tags = frozenset(("p", "li", "ul", "ol", "pre", "blockquote", "div"))
+tag_re = re.compile(r"<[^>]*>")
+block_tag_re = re.compile(r"</?(?:p|li|ul|ol|pre|blockquote|div)\b[^>]*>", re.I)
+html_heading_re = re.compile(r"<h[1-6]\b[^>]*>(.*?)</h[1-6]>", re.S | re.I)
+whitespace_re = re.compile(r"\s+")
+term_re = re.compile(r"\w\w+")
+
+
+def terms(text: str) -> list[str]:
+    return term_re.findall(text.lower())
+
+
+def node_text(node: HTMLNode) -> str:
+    parts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, ParentNode):
+            # Inline children run together, block elements are separated.
+            if node.tag in block_tags:
+                stack.append(" ")
+            stack.extend(reversed(node.children))
+        elif node.value:
+            parts.append(node.value)
+    return whitespace_re.sub(" ", "".join(parts)).strip()
+
+
+class RecordBuilder:
+    # Collects the search record of one page from its block nodes, as they
+    # are rendered, so streamed pages never hold all of their text.
+    def __init__(self):
+        self.headings = []
+        self.snippet = ""
+        self.terms = Counter()
+
+    def add(self, node: HTMLNode) -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ParentNode) and node.tag in heading_tags:
+                self.add_heading(node_text(node))
+            elif isinstance(node, ParentNode) and node.tag == "div":
+                stack.extend(reversed(node.children))
+            elif node.tag is None and node.value and "<" in node.value:
+                # Blocks served by the block cache arrive as rendered HTML.
+                for heading in html_heading_re.findall(node.value):
+                    self.add_heading(tag_re.sub("", heading).strip())
+                text = html_heading_re.sub(" ", node.value)
+                text = block_tag_re.sub(" ", text)
+                text = tag_re.sub("", text)
+                self.add_text(whitespace_re.sub(" ", text).strip())
+            else:
+                self.add_text(node_text(node))
+
+    def add_heading(self, heading: str) -> None:
+        self.headings.append(heading)
+        for term in terms(heading):
+            self.terms[term] += HEADING_WEIGHT
+
+    def add_text(self, text: str) -> None:
+        if len(self.snippet) < SNIPPET_LENGTH and text:
+            self.snippet = f"{self.snippet} {text}".strip()[:SNIPPET_LENGTH]
+        self.terms.update(terms(text))
+
+    def record(self, title: str, source: str, date: str | None = None) -> dict:
+        page_terms = Counter(self.terms)
+        for term in terms(title):
+            page_terms[term] += TITLE_WEIGHT
+        return {
+            "title": title,
+            "headings": self.headings,
+            "text": self.snippet,
+            "terms": dict(page_terms),
+            "lastmod": date
+            or time.strftime("%Y-%m-%d", time.gmtime(os.stat(source).st_mtime)),
+        }
+
+
+def page_url(dest_path: str, dest_dir_path: str) -> str:
+    url = "/" + os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if url.endswith("/index.html"):
+        return url[: -len("index.html")]
+    return url
+
+
+def write_sitemap(records: dict, dest_dir_path: str, base_url: str) -> str:
+    path = os.path.join(dest_dir_path, "sitemap.xml")
+    base_url = base_url.rstrip("/")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for dest_path in sorted(records, key=lambda p: page_url(p, dest_dir_path)):
+            url = escape(base_url + page_url(dest_path, dest_dir_path))
+            lastmod = records[dest_path]["lastmod"]
+            f.write(f"<url><loc>{url}</loc><lastmod>{lastmod}</lastmod></url>\n")
+        f.write("</urlset>\n")
+    return path
+
+
+def shard_key(term: str) -> str:
+    first = term[0]
+    return first if "a" <= first <= "z" or "0" <= first <= "9" else "_"
+
+
+def write_search_index(records: dict, dest_dir_path: str) -> str:
+    # documents.json lists [url, title, snippet] per page. The postings are
+    # split by the first character of the term into index-<char>.json, each
+    # {term: [document, weight, document, weight, ...]}, so a client only
+    # downloads the shards of the words it looks up.
+    folder = os.path.join(dest_dir_path, SEARCH_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    pages = sorted(records, key=lambda p: page_url(p, dest_dir_path))
+    documents = []
+    shards = {}
+    for document, dest_path in enumerate(pages):
+        record = records[dest_path]
+        url = page_url(dest_path, dest_dir_path)
+        documents.append([url, record["title"], record["text"]])
+        for term, weight in sorted(record["terms"].items()):
+            postings = shards.setdefault(shard_key(term), {}).setdefault(term, [])
+            postings.extend((document, weight))
+
+    def dump(name, data):
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    for name in os.listdir(folder):
+        if name.startswith("index-") and name[6:-5] not in shards:
+            os.remove(os.path.join(folder, name))
+    dump("documents.json", documents)
+    for key, postings in shards.items():
+        dump(f"index-{key}.json", postings)
+    dump("meta.json", {"documents": len(documents), "shards": sorted(shards)})
+    return folder
@@ -0,0 +1,248 @@
+import logging
+import os
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from io import BytesIO
+from urllib.parse import unquote, urlsplit
+
+from cache import get_block_cache
+from inventory import IGNORE_PATTERNS, PAGE_PATTERNS, scan_pages
+from page import parse_page
+from pipeline import read_text
+from search import page_url
+from template import load_template, template_path_for
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_SIZE = 64 * 1024 * 1024
+SERVER_THREADS = 8
+# New content files are only looked for this often, however many unknown
+# URLs are requested.
+RESCAN_INTERVAL = 1.0
+
+
+class CachedPage:
+    __slots__ = ("source", "stat", "template", "body")
+
+    def __init__(self, source: str, stat: tuple, template, body: bytes):
+        self.source = source
+        # (mtime_ns, size) of the markdown when it was rendered.
+        self.stat = stat
+        self.template = template
+        self.body = body
+
+
+class PageCache:
+    # LRU of rendered pages by URL, bounded by the size of their bodies.
+    def __init__(self, max_bytes: int = PAGE_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, CachedPage] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, url: str, stat: tuple) -> CachedPage | None:
+        with self.lock:
+            page = self.entries.get(url)
+            # A page is stale once its markdown or template changed.
+            if page is not None and (
+                page.stat != stat
+                or load_template(page.template.path) is not page.template
+            ):
+                self.size -= len(self.entries.pop(url).body)
+                page = None
+            if page is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(url)
+            self.hits += 1
+            return page
+
+    def put(self, url: str, page: CachedPage) -> None:
+        if len(page.body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(url, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[url] = page
+            self.size += len(page.body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "pages": len(self.entries)}
+
+
+class PageSite:
+    # Maps URLs to content files with the same paths a build writes, and
+    # renders them on demand.
+    def __init__(
+        self,
+        content_folder: str,
+        template_path: str,
+        cache: PageCache,
+        minify=False,
+        include=PAGE_PATTERNS,
+        ignore=IGNORE_PATTERNS,
+    ):
+        self.content_folder = content_folder
+        self.template_path = template_path
+        self.cache = cache
+        self.minify = minify
+        self.include = include
+        self.ignore = ignore
+        self.pages = {}
+        self.scanned = 0.0
+        self.scan_lock = threading.Lock()
+        # The block cache and the node classes are not thread safe, and the
+        # GIL would serialize the rendering anyway.
+        self.render_lock = threading.Lock()
+        self.scan()
+
+    def scan(self) -> None:
+        with self.scan_lock:
+            pages = scan_pages(self.content_folder, ".", self.include, self.ignore)
+            self.pages = {page_url(page.dest_path, "."): page.path for page in pages}
+            self.scanned = time.monotonic()
+
+    def source(self, url: str) -> str | None:
+        source = self.pages.get(url)
+        # Only URLs a page could have make the content folder be scanned again.
+        if (
+            source is None
+            and url.endswith(("/", ".html"))
+            and time.monotonic() - self.scanned > RESCAN_INTERVAL
+        ):
+            self.scan()
+            source = self.pages.get(url)
+        return source
+
+    def render(self, url: str) -> bytes | None:
+        source = self.source(url)
+        if source is None:
+            return None
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            self.scan()
+            return None
+        stat = (stat.st_mtime_ns, stat.st_size)
+        page = self.cache.get(url, stat)
+        if page is not None:
+            return page.body
+        with self.render_lock:
+            markdown = read_text(source)
+            parsed = parse_page(markdown, get_block_cache())
+            if parsed.draft:
+                return None
+            template = load_template(
+                template_path_for(parsed.template, self.template_path)
+            )
+            values = {"Title": parsed.title, "Content": parsed.content}
+            body = template.render(values, self.minify).encode("utf-8")
+        self.cache.put(url, CachedPage(source, stat, template, body))
+        logger.info("%s rendered", url, extra={"event": "serve", "source": source})
+        return body
+
+
+def request_url(path: str) -> str:
+    path = unquote(urlsplit(path).path)
+    url = posixpath.normpath(path)
+    if path.endswith("/") and url != "/":
+        url += "/"
+    if url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return url
+
+
+class PageRequestHandler(SimpleHTTPRequestHandler):
+    # Pages are rendered from the content folder, anything else is served
+    # from the static folder.
+    def __init__(self, *args, site: PageSite, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):
+        url = request_url(self.path)
+        try:
+            body = self.site.render(url)
+        except (OSError, ValueError) as e:
+            logger.exception("rendering %s failed", url)
+            self.send_error(500, f"Rendering failed: {e}")
+            return None
+        is_folder = not posixpath.splitext(url)[1] and not url.endswith("/")
+        if body is None and is_folder and self.site.source(url + "/"):
+            self.send_response(301)
+            self.send_header("Location", url + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if body is None:
+            return super().send_head()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return BytesIO(body)
+
+    def log_message(self, format, *args):
+        logger.info(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    # Like ThreadingHTTPServer, but requests run on a fixed pool of threads
+    # instead of one new thread each.
+    def __init__(self, address, handler, threads=SERVER_THREADS):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def serve_pages(
+    content_folder: str,
+    source_folder: str,
+    template_path: str,
+    port=8888,
+    threads=SERVER_THREADS,
+    cache_bytes=PAGE_CACHE_SIZE,
+    minify=False,
+    include=PAGE_PATTERNS,
+    ignore=IGNORE_PATTERNS,
+    verbose=True,
+) -> None:
+    site = PageSite(
+        content_folder, template_path, PageCache(cache_bytes), minify, include, ignore
+    )
+    handler = partial(PageRequestHandler, directory=source_folder, site=site)
+    server = PooledHTTPServer(("", port), handler, threads)
+    if verbose:
+        print(f"Rendering {content_folder} on demand on http://localhost:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
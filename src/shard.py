@@ -0,0 +1,55 @@
+import hashlib
+import os
+
+from manifest import MANIFEST_PATH, empty_manifest, load_manifest, save_manifest
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"{text} is not a shard, use i/N") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"{text} is not a shard, use i/N with 0 <= i < N")
+    return index, count
+
+
+def shard_of(relative_path: str, count: int) -> int:
+    key = relative_path.replace(os.sep, "/").encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % count
+
+
+def shard_manifest_path(shard: tuple[int, int], path: str = MANIFEST_PATH) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{extension}"
+
+
+def merge_manifests(paths: list[str], merged_path: str = MANIFEST_PATH) -> dict:
+    merged = empty_manifest()
+    owners = {}
+    shards = set()
+    counts = set()
+    for path in paths:
+        if not os.path.exists(path):
+            raise ValueError(f"{path} does not exist")
+        manifest = load_manifest(path)
+        shard = manifest.get("shard")
+        if shard is None:
+            raise ValueError(f"{path} is not a shard manifest")
+        shards.add(shard[0])
+        counts.add(shard[1])
+        for kind in ("pages", "assets"):
+            for dest_path, entry in manifest[kind].items():
+                owner = owners.get((kind, dest_path))
+                if owner is not None:
+                    raise ValueError(f"{dest_path} is written by {owner} and {path}")
+                owners[(kind, dest_path)] = path
+                merged[kind][dest_path] = entry
+
+    if len(counts) > 1:
+        raise ValueError(f"shard manifests come from different splits {sorted(counts)}")
+    if counts and shards != set(range(counts.pop())):
+        raise ValueError(f"missing shards, got {sorted(shards)}")
+    save_manifest(merged, merged_path)
+    return merged
@@ -0,0 +1,144 @@
+import logging
+import os
+import shutil
+
+from inventory import scan_assets
+from manifest import hash_file
+from tracing import get_build_summary
+
+logger = logging.getLogger(__name__)
+
+# ioctl request number of FICLONE (linux/fs.h), used for reflink copies on
+# btrfs, XFS and other copy-on-write filesystems.
+FICLONE = 0x40049409
+
+
+def asset_state(stat: os.stat_result) -> dict:
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def needs_copy(src_path: str, dest_path: str, checksum=False, src_stat=None) -> bool:
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return True
+    if src_stat is None:
+        src_stat = os.stat(src_path)
+    if os.path.samestat(src_stat, dest_stat):
+        return False
+    if src_stat.st_size != dest_stat.st_size:
+        return True
+    if checksum:
+        return hash_file(src_path) != hash_file(dest_path)
+    return src_stat.st_mtime_ns != dest_stat.st_mtime_ns
+
+
+def copy_file(src_path: str, dest_path: str, link=False) -> str:
+    tmp_path = f"{dest_path}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    method = None
+    if link:
+        try:
+            os.link(src_path, tmp_path)
+            method = "hardlink"
+        except OSError:
+            pass
+    if method is None:
+        method = _copy_data(src_path, tmp_path)
+        shutil.copystat(src_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+    return method
+
+
+def _copy_data(src_path: str, dest_path: str) -> str:
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        try:
+            import fcntl
+
+            fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+            return "reflink"
+        except (ImportError, OSError):
+            pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                size = os.fstat(src.fileno()).st_size
+                copied = 0
+                while copied < size:
+                    sent = os.copy_file_range(
+                        src.fileno(), dest.fileno(), size - copied
+                    )
+                    if sent == 0:
+                        break
+                    copied += sent
+                if copied == size:
+                    return "copy_file_range"
+            except OSError:
+                pass
+            src.seek(0)
+            dest.seek(0)
+            dest.truncate()
+        shutil.copyfileobj(src, dest, 1 << 20)
+        return "copy"
+
+
+def sync_tree(
+    source_folder: str,
+    dest_folder: str,
+    previous: dict | None = None,
+    checksum=False,
+    link=False,
+    verbose=True,
+    files=None,
+) -> dict:
+    # files is the asset list of the build inventory, so the source tree is
+    # only scanned here when there is none.
+    if files is None:
+        files = scan_assets(source_folder, dest_folder)
+    assets = {}
+    folders = set()
+    summary = get_build_summary()
+    if not os.path.isdir(dest_folder):
+        os.makedirs(dest_folder)
+        if verbose:
+            print(f"{dest_folder} has been created")
+    for file in files:
+        des_path = os.path.join(dest_folder, *file.relative_path.split("/"))
+        dest_root = os.path.dirname(des_path)
+        if dest_root not in folders and not os.path.isdir(dest_root):
+            os.makedirs(dest_root)
+            if verbose:
+                print(f"{dest_root} has been created")
+        folders.add(dest_root)
+        if needs_copy(file.path, des_path, checksum=checksum, src_stat=file.stat):
+            method = copy_file(file.path, des_path, link=link)
+            summary.add("assets")
+            summary.add("asset_bytes", file.size)
+            logger.info(
+                "%s has been created",
+                des_path,
+                extra={"event": "asset", "method": method, "bytes": file.size},
+            )
+            if verbose:
+                print(f"{des_path} has been created")
+        assets[os.path.join(*file.relative_path.split("/"))] = asset_state(file.stat)
+
+    for relative_path in (previous or {}).keys() - assets.keys():
+        remove_stale(dest_folder, relative_path, verbose=verbose)
+    return assets
+
+
+def remove_stale(dest_folder: str, relative_path: str, verbose=True) -> None:
+    des_path = os.path.join(dest_folder, relative_path)
+    if os.path.exists(des_path):
+        os.remove(des_path)
+    logger.info("%s has been removed", des_path, extra={"event": "remove"})
+    if verbose:
+        print(f"{des_path} has been removed")
+    folder = os.path.dirname(des_path)
+    while os.path.normpath(folder) != os.path.normpath(dest_folder):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            break
+        folder = os.path.dirname(folder)
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import re
+
+from fingerprint import asset_map_digest, rewrite_asset_urls
+from minify import minify_html
+
+placeholder_re = re.compile(r"{{\s*(>)?\s*([^\s{}]+)\s*}}")
+template_directive_re = re.compile(r"<!--\s*template:\s*(\S+)\s*-->")
+
+_compiled_templates = {}
+
+
+class Template:
+    def __init__(self, path: str, segments: list[tuple[bool, str]], sources: dict):
+        self.path = path
+        self.segments = segments
+        self.sources = sources
+        self.digest = ""
+        self._output_segments = {}
+
+    def render(self, values: dict, minify=False) -> str:
+        return "".join(self.iter_chunks(values, minify))
+
+    def output_segments(self, minify=False) -> list[tuple[bool, str]]:
+        # Literals with fingerprinted asset URLs (and minified) are built once
+        # per asset map.
+        key = (minify, asset_map_digest())
+        segments = self._output_segments.get(key)
+        if segments is None:
+            segments = []
+            for is_slot, text in self.segments:
+                if not is_slot:
+                    text = rewrite_asset_urls(text)
+                    if minify:
+                        text = minify_html(text)
+                segments.append((is_slot, text))
+            self._output_segments[key] = segments
+        return segments
+
+    def iter_chunks(self, values: dict, minify=False):
+        # String values are inserted as given, nodes are serialized (and
+        # minified) here.
+        for is_slot, text in self.output_segments(minify):
+            if not is_slot:
+                yield text
+            elif text not in values:
+                yield f"{{{{ {text} }}}}"
+            elif isinstance(values[text], str):
+                yield values[text]
+            else:
+                yield from values[text].iter_html(minify)
+
+    def write_to(self, fp, values: dict, minify=False) -> None:
+        fp.writelines(self.iter_chunks(values, minify))
+
+    def is_fresh(self) -> bool:
+        for path, mtime in self.sources.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def __repr__(self):
+        return f"<Template {self.path} {len(self.segments)} segments>"
+
+
+def compile_template(path: str) -> Template:
+    segments: list[tuple[bool, str]] = []
+    sources = {}
+    digest = hashlib.sha256()
+
+    def include(path, stack):
+        path = os.path.abspath(path)
+        if path in stack:
+            raise ValueError(f"{path} includes itself")
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        sources[path] = os.stat(path).st_mtime_ns
+        digest.update(text.encode("utf-8"))
+        position = 0
+        for match in placeholder_re.finditer(text):
+            add_literal(text[position : match.start()])
+            if match.group(1):
+                partial = os.path.join(os.path.dirname(path), match.group(2))
+                include(partial, stack + [path])
+            else:
+                segments.append((True, match.group(2)))
+            position = match.end()
+        add_literal(text[position:])
+
+    def add_literal(text):
+        if not text:
+            return
+        if segments and not segments[-1][0]:
+            segments[-1] = (False, segments[-1][1] + text)
+        else:
+            segments.append((False, text))
+
+    include(path, [])
+    template = Template(os.path.abspath(path), segments, sources)
+    template.digest = digest.hexdigest()
+    return template
+
+
+def load_template(path: str) -> Template:
+    key = os.path.abspath(path)
+    template = _compiled_templates.get(key)
+    if template is None or not template.is_fresh():
+        template = compile_template(key)
+        _compiled_templates[key] = template
+    return template
+
+
+def loaded_template_sources() -> set[str]:
+    sources = set()
+    for template in _compiled_templates.values():
+        sources.update(template.sources)
+    return sources
+
+
+def template_directive(markdown: str) -> str | None:
+    match = template_directive_re.match(markdown)
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def template_path_for(name: str | None, default_path: str) -> str:
+    # Templates named by a page live next to the default one.
+    if name is None:
+        return default_path
+    return os.path.join(os.path.dirname(default_path), name)
@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from buildlog import (
+    JsonFormatter,
+    configure_logging,
+    configure_worker_logging,
+    stop_logging,
+    worker_log_queue,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def log_from_worker(path):
+    logger.info("%s rendered in a worker", path, extra={"event": "page"})
+
+
+class TestBuildLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "build.log")
+        root = logging.getLogger()
+        handlers, level = root.handlers, root.level
+        self.addCleanup(setattr, root, "handlers", handlers)
+        self.addCleanup(root.setLevel, level)
+        self.addCleanup(stop_logging)
+
+    def records(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_formatter(self):
+        record = logging.LogRecord("main", logging.INFO, "", 0, "%s done", ("a",), None)
+        record.event = "page"
+        record.bytes = 12
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual(data["message"], "a done")
+        self.assertEqual(data["event"], "page")
+        self.assertEqual(data["bytes"], 12)
+        self.assertNotIn("args", data)
+
+    def test_records_are_written_when_stopped(self):
+        configure_logging(self.path)
+        for i in range(100):
+            logger.info("%d", i, extra={"event": "page"})
+        stop_logging()
+        messages = [record["message"] for record in self.records()]
+        self.assertEqual(messages, [str(i) for i in range(100)])
+
+    def test_worker_records(self):
+        configure_logging(self.path)
+        with ProcessPoolExecutor(
+            max_workers=1,
+            initializer=configure_worker_logging,
+            initargs=(worker_log_queue(),),
+        ) as pool:
+            pool.submit(log_from_worker, "a.md").result()
+        stop_logging()
+        (record,) = self.records()
+        self.assertEqual(record["message"], "a.md rendered in a worker")
+        self.assertEqual(record["event"], "page")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from cache import BlockCache
+from markdown import block_type_paragraph, markdown_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_get_put_counters(self):
+        cache = BlockCache()
+        key = cache.key(block_type_paragraph, "text")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "<p>text</p>")
+        self.assertEqual(cache.get(key), "<p>text</p>")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_key_depends_on_type(self):
+        self.assertNotEqual(BlockCache.key("quote", "a"), BlockCache.key("code", "a"))
+
+    def test_lru_eviction(self):
+        size = BlockCache.entry_size("a", "aaaa")
+        cache = BlockCache(max_bytes=2 * size + 1)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 2 * size)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entry_size_counts_key_and_overhead(self):
+        self.assertGreater(BlockCache.entry_size("a" * 32, "x"), 32 + 1)
+
+    def test_too_large_entry_is_not_cached(self):
+        cache = BlockCache(max_bytes=BlockCache.entry_size("a", "aaaa") - 1)
+        cache.put("a", "aaaa")
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_save_and_load(self):
+        cache = BlockCache()
+        cache.put("a", "<p>a</p>")
+        self.assertEqual(cache.take_new_entries(), [("a", "<p>a</p>")])
+        self.assertEqual(cache.take_new_entries(), [])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "blocks.json")
+            cache.save(path)
+            loaded = BlockCache()
+            loaded.load(path)
+        self.assertEqual(loaded.get("a"), "<p>a</p>")
+        self.assertEqual(loaded.take_new_entries(), [])
+
+    def test_markdown_to_html_node_with_cache(self):
+        cache = BlockCache()
+        markdown = "# Title\n\n**shared** block\n\n* a\n* b"
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(markdown_to_html_node(markdown, cache).to_html(), html)
+        self.assertEqual(markdown_to_html_node(markdown, cache).to_html(), html)
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
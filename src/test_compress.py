@@ -0,0 +1,67 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import MIN_SIZE, compress_outputs
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.public = self.tmp.name
+        self.page = os.path.join(self.public, "index.html")
+        self.write(self.page, "<p>hello</p>" * 100)
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_writes_gzip_sibling(self):
+        records = compress_outputs(self.public, verbose=False)
+        self.assertIn(".gz", records["index.html"]["encodings"])
+        with gzip.open(self.page + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 100)
+
+    def test_skips_files_that_do_not_pay_off(self):
+        small = os.path.join(self.public, "small.css")
+        self.write(small, "a" * (MIN_SIZE - 1))
+        random = os.path.join(self.public, "random.js")
+        with open(random, "wb") as f:
+            f.write(os.urandom(4096))
+        image = os.path.join(self.public, "image.png")
+        self.write(image, "x" * 4096)
+        records = compress_outputs(self.public, verbose=False)
+        self.assertEqual(records["small.css"]["encodings"], [])
+        self.assertEqual(records["random.js"]["encodings"], [])
+        self.assertNotIn("image.png", records)
+        self.assertFalse(os.path.exists(small + ".gz"))
+        self.assertFalse(os.path.exists(random + ".gz"))
+
+    def test_unchanged_outputs_are_not_compressed_again(self):
+        records = compress_outputs(self.public, verbose=False)
+        os.utime(self.page + ".gz", ns=(0, 0))
+        self.assertEqual(compress_outputs(self.public, records, verbose=False), records)
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime_ns, 0)
+
+        self.write(self.page, "<p>changed</p>" * 100)
+        compress_outputs(self.public, records, verbose=False)
+        with gzip.open(self.page + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 100)
+
+    def test_removed_outputs_lose_their_siblings(self):
+        records = compress_outputs(self.public, verbose=False)
+        os.remove(self.page)
+        self.assertEqual(compress_outputs(self.public, records, verbose=False), {})
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    def test_parallel_matches_serial(self):
+        for i in range(4):
+            self.write(os.path.join(self.public, f"{i}.css"), f"a{{b:{i}}}" * 200)
+        serial = compress_outputs(self.public, verbose=False)
+        self.assertEqual(compress_outputs(self.public, jobs=2, verbose=False), serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fingerprint import (
+    ASSET_MANIFEST_NAME,
+    asset_map_digest,
+    build_asset_map,
+    configure_asset_map,
+    fingerprint_name,
+    rewrite_asset_urls,
+    write_fingerprinted,
+)
+from markdown import text_to_children
+from template import compile_template
+from textnode import TextNode, text_node_to_html_node, text_type_image
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(configure_asset_map, None)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.public)
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.write(os.path.join(self.static, "robots.txt"), "")
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_fingerprint_name(self):
+        self.assertEqual(
+            fingerprint_name("images/a.png", "0123456789abc"), "images/a.0123456789.png"
+        )
+
+    def test_build_asset_map(self):
+        asset_map = build_asset_map(self.static)
+        self.assertEqual(sorted(asset_map), ["/images/a.png", "/index.css"])
+        self.assertRegex(asset_map["/index.css"], r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(build_asset_map(self.static), asset_map)
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        changed = build_asset_map(self.static)
+        self.assertNotEqual(changed["/index.css"], asset_map["/index.css"])
+
+    def test_write_fingerprinted(self):
+        old_map = build_asset_map(self.static)
+        write_fingerprinted(self.static, self.public, old_map, verbose=False)
+        old_css = os.path.join(self.public, old_map["/index.css"][1:])
+        self.assertTrue(os.path.exists(old_css))
+        with open(os.path.join(self.public, ASSET_MANIFEST_NAME)) as f:
+            self.assertEqual(json.load(f), old_map)
+
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        asset_map = build_asset_map(self.static)
+        write_fingerprinted(self.static, self.public, asset_map, old_map, verbose=False)
+        self.assertFalse(os.path.exists(old_css))
+        css = os.path.join(self.public, asset_map["/index.css"][1:])
+        self.assertTrue(os.path.exists(css))
+
+    def test_rewrite_references(self):
+        configure_asset_map(
+            {"/images/a.png": "/images/a.1.png", "/index.css": "/index.2.css"}
+        )
+        self.assertNotEqual(asset_map_digest(), "")
+        node = text_to_children("![alt](/images/a.png)")[0]
+        self.assertEqual(node.props["src"], "/images/a.1.png")
+        node = text_node_to_html_node(TextNode("alt", text_type_image, "/images/a.png"))
+        self.assertEqual(node.props["src"], "/images/a.png")
+        self.assertEqual(
+            rewrite_asset_urls('<link href="/index.css"><a href="/majesty">'),
+            '<link href="/index.2.css"><a href="/majesty">',
+        )
+        path = os.path.join(self.tmp.name, "template.html")
+        self.write(path, '<link href="/index.css">{{ Content }}')
+        template = compile_template(path)
+        html = template.render({"Content": "x"})
+        self.assertEqual(html, '<link href="/index.2.css">x')
+        configure_asset_map(None)
+        self.assertEqual(template.render({"Content": "x"}), '<link href="/index.css">x')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from fragments import (
+    fragment_key,
+    fragment_path,
+    load_fragment,
+    remove_unused_fragments,
+    write_fragment,
+)
+
+
+class TestFragments(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.folder = self.tmp.name
+
+    def test_key_depends_on_source_and_salt(self):
+        self.assertEqual(fragment_key("a"), fragment_key("a"))
+        self.assertNotEqual(fragment_key("a"), fragment_key("b"))
+        self.assertNotEqual(fragment_key("a"), fragment_key("a", "minify"))
+
+    def test_round_trip(self):
+        path = fragment_path(fragment_key("a"), self.folder)
+        write_fragment(path, "Tïtle", "<p>\n</p>")
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(load_fragment(f.read()), ("Tïtle", "<p>\n</p>"))
+
+    def test_concurrent_writers(self):
+        path = fragment_path(fragment_key("a"), self.folder)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for future in [
+                pool.submit(write_fragment, path, "t", "c" * 10000) for _ in range(64)
+            ]:
+                future.result()
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(load_fragment(f.read()), ("t", "c" * 10000))
+        self.assertEqual(os.listdir(os.path.dirname(path)), [os.path.basename(path)])
+
+    def test_remove_unused(self):
+        keys = [fragment_key(source) for source in "abc"]
+        for key in keys:
+            write_fragment(fragment_path(key, self.folder), "t", "c")
+        self.assertEqual(remove_unused_fragments({keys[0]}, self.folder), 2)
+        self.assertTrue(os.path.exists(fragment_path(keys[0], self.folder)))
+        self.assertFalse(os.path.exists(fragment_path(keys[1], self.folder)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, NodeArena, ParentNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -117,5 +118,94 @@ class TestParentNode(unittest.TestCase):
         )
 
 
+class TestStreamingHTML(unittest.TestCase):
+    def test_write_to_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                LeafNode("a", "link", props={"href": "/"}),
+            ],
+            props={"class": "c"},
+        )
+        buffer = io.StringIO()
+        node.write_to(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+        self.assertEqual(
+            buffer.getvalue(),
+            '<div class="c"><p><b>Bold</b> text</p><a href="/">link</a></div>',
+        )
+
+    def test_iter_html_chunks(self):
+        node = ParentNode("p", [LeafNode(None, "a"), LeafNode("i", "b")])
+        self.assertEqual(list(node.iter_html()), ["<p>", "a", "<i>b</i>", "</p>"])
+
+    def test_iter_html_deep_tree(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), len("<span></span>") * 5000 + 1)
+
+    def test_write_to_leaf(self):
+        buffer = io.StringIO()
+        LeafNode("b", "Bold").write_to(buffer)
+        self.assertEqual(buffer.getvalue(), "<b>Bold</b>")
+
+
+class TestCompactNodes(unittest.TestCase):
+    def test_no_instance_dict(self):
+        for node in (HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_tags_are_interned(self):
+        tag = "".join(["h", "2"])
+        self.assertIs(LeafNode(tag, "x").tag, LeafNode("h2", "y").tag)
+
+
+class TestNodeArena(unittest.TestCase):
+    def test_from_node_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                LeafNode("img", "", props={"src": "a.png", "alt": "a"}),
+                ParentNode("ul", [ParentNode("li", [LeafNode(None, "x")])]),
+            ],
+        )
+        arena = NodeArena.from_node(node)
+        self.assertEqual(len(arena), 8)
+        self.assertEqual(arena.to_html(), node.to_html())
+        buffer = io.StringIO()
+        arena.write_to(buffer)
+        self.assertEqual(buffer.getvalue(), node.to_html())
+
+    def test_add(self):
+        arena = NodeArena()
+        root = arena.add("p")
+        arena.add(None, "a", parent=root)
+        arena.add("i", "b", parent=root)
+        self.assertEqual(arena.to_html(), "<p>a<i>b</i></p>")
+
+    def test_minified_keeps_code(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "a\n  b "), LeafNode("code", "x  y")]),
+                ParentNode("pre", [LeafNode("code", "def f():\n    return 1\n")]),
+                LeafNode(None, "<p>c\nd</p><pre><code>e\n  f</code></pre>"),
+                LeafNode("a", "g\nh", {"href": "/x"}),
+            ],
+        )
+        self.assertEqual(
+            "".join(node.iter_html(minify=True)),
+            "<div><p>a b <code>x  y</code></p>"
+            "<pre><code>def f():\n    return 1\n</code></pre>"
+            "<p>c d</p><pre><code>e\n  f</code></pre>"
+            '<a href="/x">g h</a></div>',
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
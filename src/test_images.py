@@ -0,0 +1,101 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import images
+from images import configure_images, image_size, process_images
+from markdown import text_to_children
+from textnode import TextNode, text_node_to_html_node, text_type_image
+
+
+def png(width, height):
+    def chunk(kind, data):
+        crc = zlib.crc32(kind + data)
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    pixels = zlib.compress((b"\x00" + b"\x80" * width * 3) * height)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", pixels)
+        + chunk(b"IEND", b"")
+    )
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(configure_images, None)
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.static, "images"))
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_image_size(self):
+        self.assertEqual(image_size(self.write("a.png", png(3, 2))), (3, 2))
+        gif = b"GIF89a" + struct.pack("<HH", 7, 5) + b"\x00" * 8
+        self.assertEqual(image_size(self.write("a.gif", gif)), (7, 5))
+        jpeg = (
+            b"\xff\xd8"
+            + b"\xff\xe0"
+            + struct.pack(">H", 4)
+            + b"\x00\x00"
+            + b"\xff\xc0"
+            + struct.pack(">HBHH", 11, 8, 20, 30)
+        )
+        self.assertEqual(image_size(self.write("a.jpg", jpeg)), (30, 20))
+        self.assertIsNone(image_size(self.write("a.txt", b"not an image")))
+
+    def test_process_images(self):
+        self.write(os.path.join("static", "images", "a.png"), png(600, 300))
+        table = process_images(self.static, self.public, self.cache, verbose=False)
+        attributes = table["/images/a.png"]
+        self.assertEqual(attributes["width"], "600")
+        self.assertEqual(attributes["height"], "300")
+        self.assertEqual(attributes["loading"], "lazy")
+        if images.Image is not None:
+            srcset = attributes["srcset"].split(", ")
+            self.assertEqual([item.split(" ")[1] for item in srcset], ["480w", "600w"])
+            variant = srcset[0].split(" ")[0]
+            self.assertTrue(os.path.exists(self.public + variant))
+        self.assertEqual(
+            process_images(self.static, self.public, self.cache, verbose=False), table
+        )
+
+    def test_identical_images_processed_once(self):
+        for name in ("a.png", "b.png", "c.png"):
+            self.write(os.path.join("static", "images", name), png(600, 300))
+        with mock.patch(
+            "images.process_image", wraps=images.process_image
+        ) as process_image:
+            table = process_images(self.static, self.public, self.cache, verbose=False)
+        self.assertEqual(process_image.call_count, 1)
+        self.assertEqual(table["/images/a.png"]["width"], "600")
+        self.assertEqual(table["/images/c.png"]["width"], "600")
+
+    def test_image_node_attributes(self):
+        configure_images({"/a.png": {"width": "2", "height": "1", "loading": "lazy"}})
+        node = text_to_children("![alt](/a.png)")[0]
+        self.assertEqual(
+            node.to_html(),
+            '<img src="/a.png" alt="alt" width="2" height="1" loading="lazy"></img>',
+        )
+        node = text_to_children("![alt](/b.png)")[0]
+        self.assertEqual(node.to_html(), '<img src="/b.png" alt="alt"></img>')
+        node = text_node_to_html_node(TextNode("alt", text_type_image, "/a.png"))
+        self.assertEqual(node.to_html(), '<img src="/a.png" alt="alt"></img>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from inventory import build_inventory, ignored, matches, page_dest, scan_tree
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        for path in (
+            "content/index.md",
+            "content/v1.2/notes.md",
+            "content/blog/post.markdown",
+            "content/blog/.post.md.swp",
+            "content/blog/draft.txt",
+            "content/drafts/skip.md",
+            "static/index.css",
+            "static/images/a.png",
+        ):
+            self.write(path)
+
+    def write(self, relative_path, text=""):
+        path = os.path.join(self.tmp.name, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_matches(self):
+        self.assertTrue(matches("a/b/c.md", ["*.md"]))
+        self.assertTrue(matches("drafts/a.md", ["drafts/*"]))
+        self.assertFalse(matches("blog/drafts/a.md", ["drafts/*"]))
+        self.assertFalse(matches("a.mdx", ["*.md"]))
+
+    def test_ignored_checks_folders(self):
+        self.assertTrue(ignored("drafts/a.md", ["drafts"]))
+        self.assertTrue(ignored("blog/.git/config", [".git"]))
+        self.assertTrue(ignored("a.md~", ["*~"]))
+        self.assertFalse(ignored("blog/a.md", ["drafts"]))
+
+    def test_scan_tree_is_sorted_and_skips_ignored(self):
+        paths = [relative_path for _, relative_path, _ in scan_tree(self.content)]
+        self.assertEqual(
+            paths,
+            [
+                "index.md",
+                "blog/draft.txt",
+                "blog/post.markdown",
+                "drafts/skip.md",
+                "v1.2/notes.md",
+            ],
+        )
+        paths = [path for _, path, _ in scan_tree(self.content, ["drafts", "*.txt"])]
+        self.assertNotIn("drafts/skip.md", paths)
+        self.assertNotIn("blog/draft.txt", paths)
+
+    def test_page_dest(self):
+        public = os.path.join("out", "public")
+        self.assertEqual(
+            page_dest("v1.2/notes.md", public),
+            os.path.join(public, "v1.2", "notes.html"),
+        )
+        index = os.path.join(public, "index.html")
+        self.assertEqual(page_dest("index.md", public), index)
+
+    def test_build_inventory(self):
+        inventory = build_inventory(self.content, self.static, "public")
+        self.assertEqual(
+            [page.relative_path for page in inventory.pages],
+            ["index.md", "blog/post.markdown", "drafts/skip.md", "v1.2/notes.md"],
+        )
+        self.assertEqual(
+            [asset.dest_path for asset in inventory.assets],
+            [
+                os.path.join("public", "index.css"),
+                os.path.join("public", "images", "a.png"),
+            ],
+        )
+        self.assertEqual(inventory.assets[0].size, 0)
+        self.assertEqual(len(inventory.assets[0].digest()), 64)
+
+    def test_page_and_asset_collision(self):
+        self.write("static/index.html")
+        with self.assertRaises(ValueError):
+            build_inventory(self.content, self.static, "public")
+
+    def test_deep_tree(self):
+        path = self.content
+        for _ in range(300):
+            path = os.path.join(path, "d")
+            os.mkdir(path)
+        with open(os.path.join(path, "deep.md"), "w") as f:
+            f.write("# Deep")
+        # The walk is iterative, so the depth is not limited by the stack.
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(100)
+        try:
+            inventory = build_inventory(self.content, None, "public")
+        finally:
+            sys.setrecursionlimit(limit)
+        paths = [page.relative_path for page in inventory.pages]
+        self.assertIn("d/" * 300 + "deep.md", paths)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,440 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from main import generate_pages_recursive, rebuild_changed
+from search import SEARCH_FOLDER
+from shard import merge_manifests, shard_manifest_path
+from tracing import BuildProfiler
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.manifest = os.path.join(self.tmp.name, "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\npost")
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def build(self, **kwargs):
+        kwargs.setdefault("manifest_path", self.manifest)
+        generate_pages_recursive(
+            self.content, self.template, self.public, verbose=False, **kwargs
+        )
+
+    def test_generate_pages(self):
+        self.build()
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")),
+            "<title>Home</title><div><h1>Home</h1><p>hello</p></div>",
+        )
+
+    def test_profiled_build(self):
+        profiler = BuildProfiler(memory=False)
+        self.build(profiler=profiler)
+        self.assertEqual(len(profiler.pages), 2)
+        stages = {event["name"] for event in profiler.events}
+        for stage in ("read", "parse", "to_html", "template", "write"):
+            self.assertIn(stage, stages)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")),
+            "<title>Home</title><div><h1>Home</h1><p>hello</p></div>",
+        )
+
+    def test_streamed_pages_match(self):
+        self.build()
+        expected = self.read(os.path.join(self.public, "index.html"))
+        shutil.rmtree(self.public)
+        threshold = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        self.addCleanup(setattr, main, "STREAM_THRESHOLD", threshold)
+        self.write(
+            os.path.join(self.tmp.name, "post.html"), "<article>{{ Content }}</article>"
+        )
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "<!-- template: post.html -->\n# Blog\n\npost",
+        )
+        self.build()
+        self.assertEqual(self.read(os.path.join(self.public, "index.html")), expected)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "index.html")),
+            "<article><div><h1>Blog</h1><p>post</p></div></article>",
+        )
+
+    def test_streamed_crlf_pages_match(self):
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\r\n\r\nhello\r\nworld\r\n\r\n```\r\ncode\r\n```\r\n",
+        )
+        index = os.path.join(self.public, "index.html")
+        self.build()
+        with open(index, "rb") as f:
+            expected = f.read()
+        self.assertNotIn(b"\r", expected)
+        shutil.rmtree(self.public)
+        threshold = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        self.addCleanup(setattr, main, "STREAM_THRESHOLD", threshold)
+        self.build()
+        with open(index, "rb") as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_streamed_pages_skip_block_cache(self):
+        threshold = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        self.addCleanup(setattr, main, "STREAM_THRESHOLD", threshold)
+        main.configure_block_cache(1 << 20)
+        self.addCleanup(main.configure_block_cache, 0)
+        self.build()
+        self.assertEqual(main.get_block_cache().stats()["entries"], 0)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")),
+            "<title>Home</title><div><h1>Home</h1><p>hello</p></div>",
+        )
+
+    def test_page_template_directive(self):
+        self.write(
+            os.path.join(self.tmp.name, "post.html"), "<article>{{ Content }}</article>"
+        )
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "<!-- template: post.html -->\n# Blog\n\npost",
+        )
+        self.build()
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "index.html")),
+            "<article><div><h1>Blog</h1><p>post</p></div></article>",
+        )
+
+    def test_front_matter(self):
+        self.write(
+            os.path.join(self.tmp.name, "post.html"), "<article>{{ Content }}</article>"
+        )
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "---\ntemplate: post.html\n---\n# Blog\n\npost",
+        )
+        self.build()
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "index.html")),
+            "<article><div><h1>Blog</h1><p>post</p></div></article>",
+        )
+
+    def test_drafts_are_not_written(self):
+        self.build()
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "---\ndraft: true\n---\n# Blog",
+        )
+        records = {}
+        self.build(incremental=True, records=records)
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.assertFalse(os.path.exists(blog))
+        self.assertIsNone(records[blog])
+
+    def test_incremental_only_renders_changed_pages(self):
+        self.build(incremental=True)
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.write(blog, "untouched")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nchanged")
+        self.build(incremental=True)
+        self.assertEqual(self.read(blog), "untouched")
+        self.assertIn("changed", self.read(os.path.join(self.public, "index.html")))
+
+    def test_incremental_template_change_renders_all(self):
+        self.build(incremental=True)
+        self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.build(incremental=True)
+        blog = self.read(os.path.join(self.public, "blog", "index.html"))
+        self.assertTrue(blog.startswith("<h2>Blog</h2>"))
+
+    def test_template_change_splices_stored_content(self):
+        self.build(incremental=True)
+        self.write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        with mock.patch("main.parse_page") as parse_page:
+            self.build(incremental=True)
+        parse_page.assert_not_called()
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "index.html")),
+            "<h2>Blog</h2><div><h1>Blog</h1><p>post</p></div>",
+        )
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nchanged")
+        self.write(self.template, "<h3>{{ Title }}</h3>{{ Content }}")
+        self.build(incremental=True)
+        self.assertEqual(
+            self.read(os.path.join(self.public, "index.html")),
+            "<h3>Home</h3><div><h1>Home</h1><p>changed</p></div>",
+        )
+        fragments = os.path.join(self.tmp.name, "fragments")
+        stored = [name for _, _, names in os.walk(fragments) for name in names]
+        self.assertEqual(len(stored), 2)
+
+    def test_incremental_removes_deleted_pages(self):
+        self.build(incremental=True)
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build(incremental=True)
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.assertFalse(os.path.exists(blog))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_parallel_matches_serial(self):
+        for i in range(6):
+            self.write(
+                os.path.join(self.content, "blog", f"post{i}.md"),
+                f"# Post {i}\n\n" + "*word* " * (i * 50),
+            )
+        self.build()
+        serial = {}
+        for root, _, files in os.walk(self.public):
+            for file in files:
+                path = os.path.join(root, file)
+                serial[path] = self.read(path)
+        shutil.rmtree(self.public)
+        self.build(jobs=3)
+        for path, html in serial.items():
+            self.assertEqual(self.read(path), html)
+
+    def test_sharded_build(self):
+        for i in range(10):
+            self.write(os.path.join(self.content, f"{i}.md"), f"# Page {i}")
+        paths = []
+        for index in range(3):
+            path = shard_manifest_path((index, 3), self.manifest)
+            self.build(shard=(index, 3), manifest_path=path)
+            paths.append(path)
+        merged = merge_manifests(paths, self.manifest)
+        self.assertEqual(len(merged["pages"]), 12)
+        for i in range(10):
+            page = os.path.join(self.public, f"{i}.html")
+            self.assertIn(f"Page {i}", self.read(page))
+
+    def test_dotted_folders_and_other_files(self):
+        os.makedirs(os.path.join(self.content, "v1.2"))
+        self.write(os.path.join(self.content, "v1.2", "notes.md"), "# Notes")
+        self.write(os.path.join(self.content, "blog", "photo.txt"), "not markdown")
+        self.build()
+        notes = os.path.join(self.public, "v1.2", "notes.html")
+        self.assertIn("Notes", self.read(notes))
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.public, "blog"))), ["index.html"]
+        )
+
+    def test_identical_pages_share_a_fragment(self):
+        for name in ("a", "b", "c"):
+            os.makedirs(os.path.join(self.content, name))
+            self.write(os.path.join(self.content, name, "index.md"), "# Soon")
+        with mock.patch("main.write_fragment") as write_fragment:
+            self.build(incremental=True)
+        written = [call.args[0] for call in write_fragment.call_args_list]
+        self.assertEqual(len(written), 3)
+        self.assertEqual(len(set(written)), 3)
+
+    def test_incremental_reuses_unchanged_hashes(self):
+        self.build(incremental=True)
+        with mock.patch("inventory.hash_file") as hash_file:
+            self.build(incremental=True)
+        hash_file.assert_not_called()
+
+    def test_incremental_reuses_unchanged_templates(self):
+        post = os.path.join(self.tmp.name, "post.html")
+        self.write(post, "<article>{{ Content }}</article>")
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "---\ntemplate: post.html\n---\n# Blog\n\npost",
+        )
+        self.build(incremental=True)
+        self.write(post, "<section>{{ Content }}</section>")
+        with mock.patch("main.read_front_matter") as read_front_matter:
+            self.build(incremental=True)
+        read_front_matter.assert_not_called()
+        self.assertEqual(
+            self.read(os.path.join(self.public, "blog", "index.html")),
+            "<section><div><h1>Blog</h1><p>post</p></div></section>",
+        )
+
+    def test_search_records(self):
+        records = {}
+        self.build(records=records)
+        index = os.path.join(self.public, "index.html")
+        self.assertEqual(records[index]["title"], "Home")
+        self.assertEqual(records[index]["text"], "hello")
+        parallel = {}
+        self.build(records=parallel, jobs=2)
+        self.assertEqual(parallel, records)
+
+    def test_incremental_reuses_search_records(self):
+        self.build(incremental=True, records={})
+        records = {}
+        with mock.patch("main.generate_page") as generate_page:
+            self.build(incremental=True, records=records)
+        generate_page.assert_not_called()
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.assertEqual(records[blog]["headings"], ["Blog"])
+
+    def rebuild(self, changed, removed, **kwargs):
+        static = os.path.join(self.tmp.name, "static")
+        kwargs.setdefault("manifest_path", self.manifest)
+        rebuild_changed(
+            changed,
+            removed,
+            self.content,
+            static,
+            self.template,
+            self.public,
+            verbose=False,
+            **kwargs,
+        )
+
+    def test_rebuild_changed_page_only(self):
+        self.build(incremental=True)
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.write(blog, "untouched")
+        page = os.path.join(self.content, "index.md")
+        self.write(page, "# Home\n\nchanged")
+        self.rebuild([page], [])
+        self.assertEqual(self.read(blog), "untouched")
+        self.assertIn("changed", self.read(os.path.join(self.public, "index.html")))
+
+    def test_rebuild_removed_page(self):
+        self.build(incremental=True)
+        page = os.path.join(self.content, "blog", "index.md")
+        os.remove(page)
+        self.rebuild([], [page])
+        blog = os.path.join(self.public, "blog", "index.html")
+        self.assertFalse(os.path.exists(blog))
+
+    def test_rebuild_updates_manifest(self):
+        self.build(incremental=True)
+        page = os.path.join(self.content, "index.md")
+        self.write(page, "# Home\n\nchanged")
+        self.rebuild([page], [])
+        self.write(page, "# Home\n\nhello")
+        os.utime(page, ns=(1, 1))
+        self.build(incremental=True)
+        self.assertIn("hello", self.read(os.path.join(self.public, "index.html")))
+
+    def test_rebuild_updates_search_index(self):
+        self.build(incremental=True)
+        page = os.path.join(self.content, "blog", "index.md")
+        self.write(page, "# Posts\n\npost")
+        self.rebuild([page], [], search_index=True)
+        documents = os.path.join(self.public, SEARCH_FOLDER, "documents.json")
+        titles = [title for _, title, _ in json.loads(self.read(documents))]
+        self.assertEqual(sorted(titles), ["Home", "Posts"])
+
+    def test_rebuild_static_file(self):
+        static = os.path.join(self.tmp.name, "static", "css")
+        os.makedirs(static)
+        css = os.path.join(static, "site.css")
+        self.write(css, "body {}")
+        self.rebuild([css], [])
+        public_css = os.path.join(self.public, "css", "site.css")
+        self.assertEqual(self.read(public_css), "body {}")
+
+    def test_rebuild_skips_ignored_paths(self):
+        self.build()
+        os.makedirs(os.path.join(self.content, "drafts"))
+        draft = os.path.join(self.content, "drafts", "draft.md")
+        self.write(draft, "# Draft")
+        static = os.path.join(self.tmp.name, "static")
+        os.makedirs(static)
+        swap = os.path.join(static, "site.css.swp")
+        self.write(swap, "x")
+        ignore = ("drafts", "*.swp")
+        self.rebuild([draft, swap], [], ignore=ignore)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "drafts")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "site.css.swp")))
+        blog = os.path.join(self.content, "blog", "index.md")
+        self.rebuild([], [blog], ignore=("blog",))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "index.html")))
+
+    def test_pages_do_not_write_through_hardlinked_assets(self):
+        static = os.path.join(self.tmp.name, "static")
+        os.makedirs(static)
+        self.write(os.path.join(static, "about.html"), "static about")
+        main.sync_tree(static, self.public, link=True, verbose=False)
+        self.write(os.path.join(self.content, "about.md"), "# About")
+        self.build()
+        self.build(incremental=True)
+        self.assertEqual(self.read(os.path.join(static, "about.html")), "static about")
+
+
+class TestCopyContent(unittest.TestCase):
+    def test_checksum_sync(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static = os.path.join(tmp, "static")
+            public = os.path.join(tmp, "public")
+            os.makedirs(static)
+            os.makedirs(public)
+            src = os.path.join(static, "a.txt")
+            dest = os.path.join(public, "a.txt")
+            for path, text in ((src, "aaaa"), (dest, "bbbb")):
+                with open(path, "w") as f:
+                    f.write(text)
+                os.utime(path, ns=(0, 0))
+            manifest = os.path.join(tmp, "manifest.json")
+            for checksum, expected in ((False, "bbbb"), (True, "aaaa")):
+                main.copy_content_from_source(
+                    static,
+                    verbose=False,
+                    dest_folder=public,
+                    sync=True,
+                    manifest_path=manifest,
+                    checksum=checksum,
+                )
+                with open(dest) as f:
+                    self.assertEqual(f.read(), expected)
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_shard_from_environment(self):
+        with mock.patch.dict(os.environ, {"SHARD": "1/4"}):
+            self.assertEqual(main.parse_args([]).shard, (1, 4))
+        with mock.patch.dict(os.environ, {"SHARD": ""}):
+            self.assertIsNone(main.parse_args([]).shard)
+
+    def test_checksum_flag(self):
+        self.assertTrue(main.parse_args(["--checksum"]).checksum)
+
+    def test_bad_shard_is_a_usage_error(self):
+        with mock.patch.dict(os.environ, {"SHARD": "4/4"}):
+            with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                main.parse_args([])
+
+
+    def test_numbers_from_environment(self):
+        names = ("JOBS", "PORT", "THREADS", "PAGE_CACHE_MB", "BLOCK_CACHE_MB")
+        with mock.patch.dict(os.environ, dict.fromkeys(names, "")):
+            args = main.parse_args([])
+        self.assertEqual(args.jobs, 1)
+        self.assertEqual(args.port, 8888)
+        self.assertEqual(args.block_cache_mb, 0)
+        with mock.patch.dict(os.environ, {"JOBS": "4"}):
+            self.assertEqual(main.parse_args([]).jobs, 4)
+
+    def test_bad_number_is_a_usage_error(self):
+        for name in ("JOBS", "PORT", "THREADS", "PAGE_CACHE_MB", "BLOCK_CACHE_MB"):
+            with mock.patch.dict(os.environ, {name: "many"}):
+                with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+                    main.parse_args([])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from manifest import (
+    GENERATOR_VERSION,
+    hash_file,
+    is_stale,
+    load_manifest,
+    page_entry,
+    save_manifest,
+)
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache", "manifest.json")
+
+    def test_load_missing_manifest(self):
+        manifest = load_manifest(self.path)
+        self.assertEqual(
+            manifest,
+            {"version": GENERATOR_VERSION, "pages": {}, "assets": {}, "compressed": {}},
+        )
+
+    def test_save_and_load(self):
+        manifest = load_manifest(self.path)
+        manifest["pages"]["public/index.html"] = page_entry("a.md", "s", "t")
+        manifest["pages"]["public/post.html"] = page_entry(
+            "b.md", "s", "t", 10, 1, "post.html"
+        )
+        save_manifest(manifest, self.path)
+        self.assertEqual(load_manifest(self.path), manifest)
+
+    def test_other_version_is_discarded(self):
+        save_manifest({"version": "old", "pages": {"x": {}}}, self.path)
+        self.assertEqual(load_manifest(self.path)["pages"], {})
+
+    def test_is_stale(self):
+        dest = os.path.join(self.tmp.name, "index.html")
+        entry = page_entry("a.md", "s", "t")
+        self.assertTrue(is_stale(entry, dest, "s", "t"))
+        with open(dest, "w") as f:
+            f.write("")
+        self.assertFalse(is_stale(entry, dest, "s", "t"))
+        self.assertTrue(is_stale(entry, dest, "changed", "t"))
+        self.assertTrue(is_stale(entry, dest, "s", "changed"))
+        self.assertTrue(is_stale(None, dest, "s", "t"))
+
+    def test_hash_file(self):
+        path = os.path.join(self.tmp.name, "a.md")
+        with open(path, "w") as f:
+            f.write("# Title")
+        self.assertEqual(len(hash_file(path)), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
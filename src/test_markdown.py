@@ -2,6 +2,7 @@ import textwrap
 import unittest
 
 from markdown import (
+    StreamingDocument,
     block_to_block_type,
     block_type_code,
     block_type_heading,
@@ -10,8 +11,10 @@ from markdown import (
     block_type_quote,
     block_type_unordered_list,
     extract_title,
+    iter_blocks,
     markdown_to_blocks,
     markdown_to_html_node,
+    scan_blocks,
 )
 
 
@@ -62,6 +65,35 @@ class TestMarkdownToBlocks(unittest.TestCase):
         ]
         self.assertEqual(blocks, result)
 
+    def test_markdown_to_blocks_code_with_blank_lines(self):
+        text = textwrap.dedent("""\
+        Intro
+
+        ```
+        first
+
+        second
+        ```
+        After""")
+        blocks = markdown_to_blocks(text)
+        result = ["Intro", "```\nfirst\n\nsecond\n```", "After"]
+        self.assertEqual(blocks, result)
+
+    def test_scan_blocks_spans(self):
+        lines = ["# Title", "", "* a", "* b", "", "", "1. one", "3. three"]
+        result = [
+            (block_type_heading, (0, 1)),
+            (block_type_unordered_list, (2, 4)),
+            (block_type_paragraph, (6, 8)),
+        ]
+        self.assertEqual(list(scan_blocks(lines)), result)
+
+    def test_scan_blocks_lazy(self):
+        lines = iter(["para", "", "```", "code"])
+        blocks = scan_blocks(lines)
+        self.assertEqual(next(blocks), (block_type_paragraph, (0, 1)))
+        self.assertEqual(next(blocks), (block_type_code, (2, 4)))
+
     def test_block_to_block_type_code(self):
         code_block = textwrap.dedent("""\
         ```python
@@ -172,6 +204,59 @@ class TestMarkdownToHTML(unittest.TestCase):
         self.assertEqual(repr(html_node), result)
 
 
+class TestStreaming(unittest.TestCase):
+    markdown = textwrap.dedent("""\
+    # Title
+
+    some *text*
+
+    ```
+    a
+
+    b
+    ```
+
+    > quote""")
+
+    def test_iter_blocks(self):
+        blocks = list(iter_blocks(iter(self.markdown.split("\n"))))
+        self.assertEqual(
+            blocks,
+            [
+                (block_type_heading, "# Title"),
+                (block_type_paragraph, "some *text*"),
+                (block_type_code, "```\na\n\nb\n```"),
+                (block_type_quote, "> quote"),
+            ],
+        )
+
+    def test_streaming_document_matches_tree(self):
+        document = StreamingDocument(iter(self.markdown.split("\n")))
+        self.assertEqual(
+            "".join(document.iter_html()),
+            markdown_to_html_node(self.markdown).to_html(),
+        )
+
+    def test_extract_title_from_lines(self):
+        self.assertEqual(extract_title(iter(self.markdown.split("\n"))), "Title")
+
+
+class TestCodeBlockToHTML(unittest.TestCase):
+    def test_code_block_keeps_blank_lines(self):
+        markdown = "```\na\n\nb\n```"
+        html = markdown_to_html_node(markdown).to_html()
+        self.assertEqual(html, "<div><pre><code>a\n\nb</code></pre></div>")
+
+    def test_one_line_fence_is_a_code_block(self):
+        markdown = "```code```\nafter\n\n```a *b*```"
+        self.assertEqual(block_to_block_type("```code```"), block_type_code)
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><pre><code>code</code></pre><p>after</p>"
+            "<pre><code>a *b*</code></pre></div>",
+        )
+
+
 class TestTransformMarkdownToHTML(unittest.TestCase):
     def test_extract_title(self):
         markdown = textwrap.dedent("""\
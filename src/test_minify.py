@@ -0,0 +1,33 @@
+import unittest
+
+from minify import collapse_whitespace, minify_fragment, minify_html
+
+
+class TestMinify(unittest.TestCase):
+    def test_collapse_whitespace(self):
+        self.assertEqual(collapse_whitespace("a \n\t b"), "a b")
+        text = "nothing to do"
+        self.assertIs(collapse_whitespace(text), text)
+        self.assertEqual(collapse_whitespace("a  b"), "a  b")
+
+    def test_fragment_keeps_preserved_elements(self):
+        self.assertEqual(
+            minify_fragment("<p>a\nb</p><PRE>x\n  y</PRE><code>1  2</code>"),
+            "<p>a b</p><PRE>x\n  y</PRE><code>1  2</code>",
+        )
+
+    def test_html_drops_space_around_block_tags(self):
+        self.assertEqual(
+            minify_html("<ul>\n  <li> a <b>b</b> c </li>\n</ul>\n"),
+            "<ul><li>a <b>b</b> c</li></ul>",
+        )
+
+    def test_html_keeps_scripts(self):
+        html = "<body>\n<script>\nif (a  <  b) {}\n</script>\n</body>"
+        self.assertEqual(
+            minify_html(html), "<body><script>\nif (a  <  b) {}\n</script></body>"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
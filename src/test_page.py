@@ -0,0 +1,97 @@
+import textwrap
+import unittest
+
+from cache import BlockCache
+from markdown import markdown_to_html_node
+from page import parse_front_matter, parse_page
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        lines = textwrap.dedent("""\
+        ---
+        template: post.html
+        draft: true
+        date: 2024-05-01
+        title: "Quoted: title"
+        ---
+        # Heading""").split("\n")
+        meta, skip = parse_front_matter(lines)
+        self.assertEqual(
+            meta,
+            {
+                "template": "post.html",
+                "draft": True,
+                "date": "2024-05-01",
+                "title": "Quoted: title",
+            },
+        )
+        self.assertEqual(lines[skip], "# Heading")
+
+    def test_template_directive(self):
+        meta, skip = parse_front_matter(["<!-- template: post.html -->", "# Title"])
+        self.assertEqual(meta, {"template": "post.html"})
+        self.assertEqual(skip, 1)
+
+    def test_no_front_matter(self):
+        self.assertEqual(parse_front_matter(["# Title"]), ({}, 0))
+        self.assertEqual(parse_front_matter([]), ({}, 0))
+
+    def test_only_reads_front_matter_lines(self):
+        lines = iter(["---", "draft: false", "---", "# Title", "text"])
+        parse_front_matter(lines)
+        self.assertEqual(list(lines), ["# Title", "text"])
+
+    def test_invalid_front_matter(self):
+        for lines in (
+            ["---", "title: x"],
+            ["---", "no separator", "---"],
+            ["---", "draft: maybe", "---"],
+            ["---", "date: May 1st", "---"],
+        ):
+            with self.assertRaises(ValueError):
+                parse_front_matter(lines)
+
+
+class TestParsePage(unittest.TestCase):
+    markdown = textwrap.dedent("""\
+    ---
+    date: 2024-05-01
+    ---
+    ## Before
+
+    # Title
+
+    text
+
+    ### Part
+    more""")
+
+    def test_page(self):
+        page = parse_page(self.markdown)
+        self.assertEqual(page.title, "Title")
+        self.assertEqual(page.date, "2024-05-01")
+        self.assertFalse(page.draft)
+        self.assertIsNone(page.template)
+        self.assertEqual(page.outline, [(2, "Before"), (1, "Title"), (3, "Part\nmore")])
+        body = self.markdown.split("---\n", 2)[2]
+        self.assertEqual(page.content.to_html(), markdown_to_html_node(body).to_html())
+
+    def test_front_matter_title(self):
+        page = parse_page("---\ntitle: Named\n---\ntext")
+        self.assertEqual(page.title, "Named")
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            parse_page("## Only a subheading")
+
+    def test_block_cache(self):
+        cache = BlockCache(1 << 20)
+        html = parse_page(self.markdown).content.to_html()
+        self.assertEqual(parse_page(self.markdown, cache).content.to_html(), html)
+        self.assertEqual(parse_page(self.markdown, cache).content.to_html(), html)
+        self.assertEqual(cache.stats()["hits"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from pipeline import BackgroundWriter, prefetch, replace_file
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_prefetch_keeps_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(20):
+                path = os.path.join(tmp, f"{i}.md")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(f"page {i}")
+                paths.append(path)
+            result = list(prefetch(paths, max_ahead=3, threads=2))
+        self.assertEqual([path for path, _ in result], paths)
+        self.assertEqual([text for _, text in result], [f"page {i}" for i in range(20)])
+
+    def test_prefetch_reads_ahead_lazily(self):
+        consumed = []
+
+        def paths():
+            for i in range(100):
+                consumed.append(i)
+                yield os.devnull
+
+        reader = prefetch(paths(), max_ahead=4)
+        next(reader)
+        self.assertLessEqual(len(consumed), 5)
+        reader.close()
+
+    def test_prefetch_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            list(prefetch(["/does/not/exist.md"]))
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_writes_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with BackgroundWriter(max_pending_bytes=10) as writer:
+                for i in range(10):
+                    writer.write(os.path.join(tmp, "dir", f"{i}.html"), "x" * i)
+            for i in range(10):
+                with open(os.path.join(tmp, "dir", f"{i}.html")) as f:
+                    self.assertEqual(f.read(), "x" * i)
+
+    def test_backpressure(self):
+        writer = BackgroundWriter(max_pending_bytes=5, threads=1)
+        release = threading.Event()
+        writer.pool.submit(release.wait)
+        with tempfile.TemporaryDirectory() as tmp:
+            writer.write(os.path.join(tmp, "a.html"), "aaaa")
+            blocked = threading.Thread(
+                target=writer.write, args=(os.path.join(tmp, "b.html"), "bbbb")
+            )
+            blocked.start()
+            blocked.join(0.1)
+            self.assertTrue(blocked.is_alive())
+            self.assertEqual(writer.pending_bytes, 4)
+            release.set()
+            blocked.join(5)
+            writer.close()
+            self.assertEqual(writer.pending_bytes, 0)
+
+    def test_errors_are_raised(self):
+        writer = BackgroundWriter()
+        writer.write(os.path.join(os.devnull, "a.html"), "a")
+        with self.assertRaises(OSError):
+            writer.close()
+
+
+class TestReplaceFile(unittest.TestCase):
+    def test_hardlinks_are_not_written_through(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "source.html")
+            page = os.path.join(tmp, "page.html")
+            with open(source, "w") as f:
+                f.write("source")
+            os.link(source, page)
+            with replace_file(page) as f:
+                f.write("page")
+            with open(source) as f:
+                self.assertEqual(f.read(), "source")
+            with open(page) as f:
+                self.assertEqual(f.read(), "page")
+
+    def test_failed_write_keeps_the_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "page.html")
+            with open(page, "w") as f:
+                f.write("old")
+            with self.assertRaises(ValueError):
+                with replace_file(page) as f:
+                    f.write("new")
+                    raise ValueError("failed")
+            with open(page) as f:
+                self.assertEqual(f.read(), "old")
+            self.assertEqual(os.listdir(tmp), ["page.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from markdown import markdown_to_html_node
+from search import (
+    HEADING_WEIGHT,
+    TITLE_WEIGHT,
+    RecordBuilder,
+    page_url,
+    write_search_index,
+    write_sitemap,
+)
+
+
+class TestRecordBuilder(unittest.TestCase):
+    def record(self, node, title="Page"):
+        builder = RecordBuilder()
+        builder.add(node)
+        with tempfile.NamedTemporaryFile() as f:
+            return builder.record(title, f.name)
+
+    def test_headings_and_text(self):
+        node = markdown_to_html_node("# Page\n\nSome **bold** text\n\n## Part two")
+        record = self.record(node)
+        self.assertEqual(record["headings"], ["Page", "Part two"])
+        self.assertEqual(record["text"], "Some bold text")
+        self.assertEqual(record["terms"]["page"], HEADING_WEIGHT + TITLE_WEIGHT)
+        self.assertEqual(record["terms"]["part"], HEADING_WEIGHT)
+        self.assertEqual(record["terms"]["bold"], 1)
+
+    def test_cached_fragments_match_nodes(self):
+        markdown = "# Page\n\n- one\n- two\n\n> quoted *words*"
+        node = markdown_to_html_node(markdown)
+        fragments = [LeafNode(None, child.to_html()) for child in node.children]
+        cached = ParentNode("div", fragments)
+        self.assertEqual(self.record(cached), self.record(node))
+
+    def test_snippet_is_bounded(self):
+        node = markdown_to_html_node("word " * 1000)
+        record = self.record(node)
+        self.assertLessEqual(len(record["text"]), 200)
+        self.assertEqual(record["terms"]["word"], 1000)
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.public = self.tmp.name
+        self.records = {
+            os.path.join(self.public, "index.html"): {
+                "title": "Home",
+                "headings": ["Home"],
+                "text": "hello",
+                "terms": {"home": 15, "hello": 1},
+                "lastmod": "2024-01-02",
+            },
+            os.path.join(self.public, "blog", "a&b.html"): {
+                "title": "Post",
+                "headings": [],
+                "text": "hello again",
+                "terms": {"post": 10, "hello": 1, "again": 1},
+                "lastmod": "2024-02-03",
+            },
+        }
+
+    def load(self, name):
+        with open(os.path.join(self.public, "search", name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join("public", "index.html"), "public"), "/")
+        self.assertEqual(
+            page_url(os.path.join("public", "a", "index.html"), "public"), "/a/"
+        )
+        self.assertEqual(
+            page_url(os.path.join("public", "b.html"), "public"), "/b.html"
+        )
+
+    def test_sitemap(self):
+        path = write_sitemap(self.records, self.public, "https://example.com/")
+        with open(path, encoding="utf-8") as f:
+            sitemap = f.read()
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/blog/a&amp;b.html</loc>", sitemap)
+        self.assertIn("<lastmod>2024-02-03</lastmod>", sitemap)
+
+    def test_search_index(self):
+        write_search_index(self.records, self.public)
+        documents = self.load("documents.json")
+        self.assertEqual(documents[0], ["/", "Home", "hello"])
+        self.assertEqual(self.load("index-h.json")["hello"], [0, 1, 1, 1])
+        self.assertEqual(self.load("index-p.json"), {"post": [1, 10]})
+        self.assertEqual(self.load("meta.json")["shards"], ["a", "h", "p"])
+
+    def test_search_index_removes_old_shards(self):
+        write_search_index(self.records, self.public)
+        del self.records[os.path.join(self.public, "blog", "a&b.html")]
+        write_search_index(self.records, self.public)
+        shard = os.path.join(self.public, "search", "index-p.json")
+        self.assertFalse(os.path.exists(shard))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from functools import partial
+
+from server import (
+    CachedPage,
+    PageCache,
+    PageRequestHandler,
+    PageSite,
+    PooledHTTPServer,
+    request_url,
+)
+from template import load_template
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = os.path.join(self.tmp.name, "template.html")
+        with open(path, "w") as f:
+            f.write(TEMPLATE)
+        self.template = load_template(path)
+
+    def page(self, body: bytes, stat=(1, 1)) -> CachedPage:
+        return CachedPage("index.md", stat, self.template, body)
+
+    def test_get_checks_stat(self):
+        cache = PageCache(100)
+        cache.put("/", self.page(b"x"))
+        self.assertEqual(cache.get("/", (1, 1)).body, b"x")
+        self.assertIsNone(cache.get("/", (2, 1)))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "pages": 0})
+
+    def test_evicts_least_recently_used(self):
+        cache = PageCache(10)
+        cache.put("/a/", self.page(b"aaaa"))
+        cache.put("/b/", self.page(b"bbbb"))
+        cache.get("/a/", (1, 1))
+        cache.put("/c/", self.page(b"cccc"))
+        self.assertIsNone(cache.get("/b/", (1, 1)))
+        self.assertIsNotNone(cache.get("/a/", (1, 1)))
+        self.assertEqual(cache.size, 8)
+
+    def test_skips_pages_larger_than_the_cache(self):
+        cache = PageCache(2)
+        cache.put("/", self.page(b"xxx"))
+        self.assertEqual(cache.stats()["pages"], 0)
+
+
+class TestRequestUrl(unittest.TestCase):
+    def test_request_url(self):
+        self.assertEqual(request_url("/"), "/")
+        self.assertEqual(request_url("/blog/?q=1"), "/blog/")
+        self.assertEqual(request_url("/blog/index.html"), "/blog/")
+        self.assertEqual(request_url("/a/../b%20c/"), "/b c/")
+        self.assertEqual(request_url("/index.css"), "/index.css")
+
+
+class TestPageSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.site = PageSite(self.content, self.template, PageCache())
+
+    def write(self, path: str, text: str) -> None:
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_render(self):
+        body = self.site.render("/").decode("utf-8")
+        self.assertIn("<title>Home</title>", body)
+        self.assertIn("<p>Hello</p>", body)
+        self.assertIs(self.site.render("/"), self.site.render("/"))
+        self.assertIsNone(self.site.render("/missing/"))
+
+    def test_render_changed_source(self):
+        page = os.path.join(self.content, "index.md")
+        self.site.render("/")
+        self.write(page, "# Changed home")
+        stat = os.stat(page)
+        os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIn(b"<title>Changed home</title>", self.site.render("/"))
+
+    def test_drafts_are_not_served(self):
+        self.write(
+            os.path.join(self.content, "blog", "index.md"),
+            "---\ndraft: true\n---\n# Blog",
+        )
+        self.assertIsNone(self.site.render("/blog/"))
+
+    def test_new_pages_are_found(self):
+        self.site.scanned = 0.0
+        os.makedirs(os.path.join(self.content, "new"))
+        self.write(os.path.join(self.content, "new", "index.md"), "# New")
+        self.assertIn(b"<title>New</title>", self.site.render("/new/"))
+
+    def test_serve(self):
+        handler = partial(PageRequestHandler, directory=self.static, site=self.site)
+        server = PooledHTTPServer(("127.0.0.1", 0), handler, threads=2)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/blog") as response:
+            self.assertEqual(response.url, f"{base}/blog/")
+            self.assertIn(b"<title>Blog</title>", response.read())
+        with urllib.request.urlopen(f"{base}/index.css") as response:
+            self.assertEqual(response.read(), b"body {}")
+        with self.assertRaises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base}/missing.html")
+        e.exception.close()
+        self.assertEqual(e.exception.code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
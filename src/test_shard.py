@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from manifest import load_manifest, page_entry, save_manifest
+from shard import (
+    merge_manifests,
+    parse_shard,
+    shard_manifest_path,
+    shard_of,
+)
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("0/1"), (0, 1))
+        self.assertEqual(parse_shard("2/3"), (2, 3))
+        for text in ("3/3", "-1/2", "1/0", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shards_cover_every_page_once(self):
+        pages = [f"{i}/index.md" for i in range(50)]
+        selected = []
+        for index in range(4):
+            selected += [page for page in pages if shard_of(page, 4) == index]
+        self.assertEqual(sorted(selected), sorted(pages))
+
+    def test_shard_of_is_stable(self):
+        path = "blog/post/index.md"
+        self.assertEqual(shard_of(path, 7), shard_of(path, 7))
+        self.assertEqual(shard_of(os.path.join("a", "b.md"), 5), shard_of("a/b.md", 5))
+
+    def test_shard_manifest_path(self):
+        path = os.path.join(".cache", "manifest.json")
+        self.assertEqual(
+            shard_manifest_path((1, 3), path),
+            os.path.join(".cache", "manifest.shard-1-of-3.json"),
+        )
+
+    def write_shard(self, shard, pages, assets=None):
+        path = shard_manifest_path(shard, os.path.join(self.tmp.name, "manifest.json"))
+        manifest = load_manifest(path)
+        manifest["shard"] = list(shard)
+        manifest["pages"] = pages
+        manifest["assets"] = assets or {}
+        save_manifest(manifest, path)
+        return path
+
+    def test_merge_manifests(self):
+        a = self.write_shard((0, 2), {"public/a.html": page_entry("a.md", "s", "t")})
+        b = self.write_shard((1, 2), {"public/b.html": page_entry("b.md", "s", "t")})
+        merged_path = os.path.join(self.tmp.name, "manifest.json")
+        merged = merge_manifests([a, b], merged_path)
+        self.assertEqual(sorted(merged["pages"]), ["public/a.html", "public/b.html"])
+        self.assertEqual(load_manifest(merged_path)["pages"], merged["pages"])
+
+    def test_merge_collision(self):
+        a = self.write_shard((0, 2), {"public/a.html": page_entry("a.md", "s", "t")})
+        b = self.write_shard((1, 2), {"public/a.html": page_entry("A.md", "s", "t")})
+        with self.assertRaises(ValueError):
+            merge_manifests([a, b], os.path.join(self.tmp.name, "manifest.json"))
+
+    def test_merge_missing_shard(self):
+        a = self.write_shard((0, 3), {})
+        b = self.write_shard((1, 3), {})
+        with self.assertRaises(ValueError):
+            merge_manifests([a, b], os.path.join(self.tmp.name, "manifest.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from sync import copy_file, needs_copy, sync_tree
+
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # The source folder name also appears in its own subfolder, which the
+        # old str.replace mapping turned into the wrong destination.
+        self.source = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.source, "static", "images"))
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "static", "images", "a.png"), "png")
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_sync_copies_with_relative_paths(self):
+        assets = sync_tree(self.source, self.public, verbose=False)
+        self.assertEqual(
+            sorted(assets),
+            ["index.css", os.path.join("static", "images", "a.png")],
+        )
+        png = os.path.join(self.public, "static", "images", "a.png")
+        self.assertEqual(self.read(png), "png")
+
+    def test_sync_skips_unchanged_files(self):
+        sync_tree(self.source, self.public, link=False, verbose=False)
+        css = os.path.join(self.public, "index.css")
+        inode = os.stat(css).st_ino
+        sync_tree(self.source, self.public, link=False, verbose=False)
+        self.assertEqual(os.stat(css).st_ino, inode)
+
+    def test_sync_copies_changed_files(self):
+        sync_tree(self.source, self.public, link=False, verbose=False)
+        self.write(os.path.join(self.source, "index.css"), "body { margin: 0 }")
+        sync_tree(self.source, self.public, link=False, verbose=False)
+        css = os.path.join(self.public, "index.css")
+        self.assertEqual(self.read(css), "body { margin: 0 }")
+
+    def test_sync_removes_stale_assets_only(self):
+        assets = sync_tree(self.source, self.public, verbose=False)
+        page = os.path.join(self.public, "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.source, "static", "images", "a.png"))
+        sync_tree(self.source, self.public, assets, verbose=False)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "static")))
+        self.assertTrue(os.path.exists(page))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_copy_file_without_link(self):
+        src = os.path.join(self.source, "index.css")
+        dest = os.path.join(self.tmp.name, "copy.css")
+        method = copy_file(src, dest, link=False)
+        self.assertIn(method, ("reflink", "copy_file_range", "copy"))
+        self.assertEqual(self.read(dest), "body {}")
+        self.assertFalse(os.path.samefile(src, dest))
+        self.assertFalse(needs_copy(src, dest))
+
+    def test_needs_copy_checksum(self):
+        src = os.path.join(self.source, "index.css")
+        dest = os.path.join(self.tmp.name, "copy.css")
+        self.write(dest, "body {}")
+        self.assertFalse(needs_copy(src, dest, checksum=True))
+        self.write(dest, "body []")
+        self.assertTrue(needs_copy(src, dest, checksum=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
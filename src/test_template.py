@@ -0,0 +1,113 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import (
+    compile_template,
+    load_template,
+    template_directive,
+    template_path_for,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_segments(self):
+        path = self.write("t.html", "<title>{{ Title }}</title><p>{{Content}}</p>")
+        template = compile_template(path)
+        self.assertEqual(
+            template.segments,
+            [
+                (False, "<title>"),
+                (True, "Title"),
+                (False, "</title><p>"),
+                (True, "Content"),
+                (False, "</p>"),
+            ],
+        )
+
+    def test_render(self):
+        path = self.write("t.html", "<title>{{ Title }}</title>{{ Content }}")
+        html = compile_template(path).render({"Title": "Hi", "Content": "<p>x</p>"})
+        self.assertEqual(html, "<title>Hi</title><p>x</p>")
+
+    def test_render_does_not_expand_placeholders_in_values(self):
+        path = self.write("t.html", "{{ Content }}|{{ Title }}")
+        html = compile_template(path).render({"Title": "a", "Content": "{{ Title }}"})
+        self.assertEqual(html, "{{ Title }}|a")
+
+    def test_write_node_value(self):
+        path = self.write("t.html", "<main>{{ Content }}</main>")
+        buffer = io.StringIO()
+        node = ParentNode("p", [LeafNode("b", "x")])
+        compile_template(path).write_to(buffer, {"Content": node})
+        self.assertEqual(buffer.getvalue(), "<main><p><b>x</b></p></main>")
+
+    def test_render_minified(self):
+        path = self.write(
+            "t.html",
+            "<!DOCTYPE html>\n<html>\n  <head>\n    <title> {{ Title }} </title>\n"
+            "  </head>\n  <body>\n    <pre>  a\n  b</pre>\n    {{ Content }}\n"
+            "  </body>\n</html>\n",
+        )
+        node = ParentNode("p", [LeafNode(None, "one\ntwo  three")])
+        html = compile_template(path).render({"Title": "Hi", "Content": node}, True)
+        self.assertEqual(
+            html,
+            "<!DOCTYPE html><html><head><title>Hi</title></head><body>"
+            "<pre>  a\n  b</pre><p>one two three</p></body></html>",
+        )
+
+    def test_unknown_placeholder_is_kept(self):
+        path = self.write("t.html", "{{ Title }} {{ Date }}")
+        self.assertEqual(compile_template(path).render({"Title": "a"}), "a {{ Date }}")
+
+    def test_partials(self):
+        self.write("nav.html", "<nav>{{ Title }}</nav>")
+        path = self.write("t.html", "{{> nav.html }}<main>{{ Content }}</main>")
+        template = compile_template(path)
+        self.assertEqual(
+            template.render({"Title": "a", "Content": "b"}),
+            "<nav>a</nav><main>b</main>",
+        )
+        self.assertEqual(len(template.sources), 2)
+
+    def test_recursive_partial(self):
+        path = self.write("t.html", "{{> t.html }}")
+        with self.assertRaises(ValueError):
+            compile_template(path)
+
+    def test_load_template_cache(self):
+        path = self.write("t.html", "{{ Content }}")
+        template = load_template(path)
+        self.assertIs(load_template(path), template)
+        self.write("t.html", "<b>{{ Content }}</b>")
+        os.utime(path, ns=(0, 0))
+        reloaded = load_template(path)
+        self.assertIsNot(reloaded, template)
+        self.assertNotEqual(reloaded.digest, template.digest)
+
+    def test_template_directive(self):
+        markdown = "<!-- template: post.html -->\n# Title"
+        self.assertEqual(template_directive(markdown), "post.html")
+        self.assertIsNone(template_directive("# Title"))
+        self.assertEqual(
+            template_path_for("post.html", os.path.join("site", "template.html")),
+            os.path.join("site", "post.html"),
+        )
+        self.assertEqual(template_path_for(None, "template.html"), "template.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ from textnode import (
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
+    helper_create_text_node_with_links,
     text_node_to_html_node,
     text_to_textnodes,
     text_type_bold,
@@ -38,6 +39,11 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("", text_type_image, url="url to image")
         self.assertEqual(repr(node), f"<TextNode  {text_type_image} url to image>")
 
+    def test_text_type_is_str(self):
+        node = TextNode("x", "bold")
+        self.assertEqual(node, TextNode("x", text_type_bold))
+        self.assertEqual(f"{text_type_bold}", "bold")
+
     def test_link_value(self):
         node = TextNode("Click here", text_type_link, url="google.com")
         self.assertEqual(
@@ -145,6 +151,91 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertEqual(new_nodes, result)
 
+    def test_text_to_textnodes_nested(self):
+        new_nodes = text_to_textnodes("**bold *italic* text** end")
+        result = [
+            TextNode(
+                "bold italic text",
+                text_type_bold,
+                children=[
+                    TextNode("bold ", text_type_text),
+                    TextNode("italic", text_type_italic),
+                    TextNode(" text", text_type_text),
+                ],
+            ),
+            TextNode(" end", text_type_text),
+        ]
+        self.assertEqual(new_nodes, result)
+        self.assertEqual(
+            text_node_to_html_node(new_nodes[0]).to_html(),
+            "<b>bold <i>italic</i> text</b>",
+        )
+
+    def test_text_to_textnodes_triple_star(self):
+        new_nodes = text_to_textnodes("***both***")
+        self.assertEqual(
+            text_node_to_html_node(new_nodes[0]).to_html(), "<b><i>both</i></b>"
+        )
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        new_nodes = text_to_textnodes("2 * 3 and *open **bold")
+        result = [TextNode("2 * 3 and *open **bold", text_type_text)]
+        self.assertEqual(new_nodes, result)
+
+    def test_text_to_textnodes_unclosed_delimiter_is_merged(self):
+        new_nodes = text_to_textnodes("*a **b* c **d `e` f")
+        result = [
+            TextNode("a **b", text_type_italic),
+            TextNode(" c **d ", text_type_text),
+            TextNode("e", text_type_code),
+            TextNode(" f", text_type_text),
+        ]
+        self.assertEqual(new_nodes, result)
+
+    def test_text_to_textnodes_code_is_verbatim(self):
+        new_nodes = text_to_textnodes("`a *b* [c](d)` e")
+        result = [
+            TextNode("a *b* [c](d)", text_type_code),
+            TextNode(" e", text_type_text),
+        ]
+        self.assertEqual(new_nodes, result)
+
+    def test_text_to_textnodes_link_inside_emphasis(self):
+        new_nodes = text_to_textnodes("*see [docs](/d)*")
+        self.assertEqual(
+            text_node_to_html_node(new_nodes[0]).to_html(),
+            '<i>see <a href="/d">docs</a></i>',
+        )
+
+    def test_text_to_textnodes_brackets_without_link(self):
+        new_nodes = text_to_textnodes("[x] and [y](z)")
+        result = [
+            TextNode("[x] and ", text_type_text),
+            TextNode("y", text_type_link, "z"),
+        ]
+        self.assertEqual(new_nodes, result)
+
+    def test_split_nodes_link_ignores_images(self):
+        node = TextNode("![a](b) and [c](d)", text_type_text)
+        result = [
+            TextNode("![a](b) and ", text_type_text),
+            TextNode("c", text_type_link, "d"),
+        ]
+        self.assertEqual(split_nodes_link([node]), result)
+
+    def test_helper_repeated_text_before_link(self):
+        text = "a [x](u) a [y](v)"
+        new_nodes = helper_create_text_node_with_links(
+            text, [("x", "u"), ("y", "v")], text_type_link
+        )
+        result = [
+            TextNode("a ", text_type_text),
+            TextNode("x", text_type_link, "u"),
+            TextNode(" a ", text_type_text),
+            TextNode("y", text_type_link, "v"),
+        ]
+        self.assertEqual(new_nodes, result)
+
 
 if __name__ == "__main__":
     unittest.main()
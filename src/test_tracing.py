@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tracing import BuildProfiler, BuildSummary, stage_timer
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stages_and_pages(self):
+        profiler = BuildProfiler()
+        with profiler.page("a.md"):
+            with profiler.stage("read", "a.md"):
+                data = [0] * 10000
+            with profiler.stage("write", "a.md"):
+                del data
+        names = [event["name"] for event in profiler.events]
+        self.assertEqual(names, ["read", "write", "page"])
+        self.assertEqual(len(profiler.pages), 1)
+        self.assertGreater(profiler.pages[0]["peak_memory"], 10000)
+        self.assertEqual(sorted(profiler.stage_totals()), ["read", "write"])
+
+    def test_chrome_trace(self):
+        profiler = BuildProfiler(memory=False)
+        with profiler.page("a.md"):
+            with profiler.stage("read", "a.md"):
+                pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            profiler.write_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        events = trace["traceEvents"]
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["args"], {"page": "a.md"})
+        self.assertEqual(min(event["ts"] for event in events), 0)
+
+    def test_merge_and_summary(self):
+        profiler = BuildProfiler(memory=False)
+        worker = BuildProfiler(memory=False)
+        for page in ("fast.md", "slow.md"):
+            with worker.page(page):
+                pass
+        worker.pages[1]["dur"] = 10**9
+        profiler.merge(worker.events, worker.pages)
+        summary = profiler.summary(top=1)
+        self.assertIn("slow.md", summary)
+        self.assertNotIn("fast.md", summary)
+
+    def test_stage_timer_without_profiler(self):
+        with stage_timer(None)("read", "a.md"):
+            pass
+
+
+class TestBuildSummary(unittest.TestCase):
+    def test_counts_and_stages(self):
+        summary = BuildSummary()
+        profiler = BuildProfiler(memory=False)
+        with stage_timer(profiler, summary)("copy_static", "static"):
+            summary.add("assets")
+            summary.add("asset_bytes", 2048)
+        summary.merge({"pages": 3, "page_bytes": 1024})
+        fields = summary.fields({"hits": 5, "misses": 1})
+        self.assertEqual(fields["pages"], 3)
+        self.assertEqual(fields["asset_bytes"], 2048)
+        self.assertEqual(fields["cache_hits"], 5)
+        self.assertEqual(list(fields["stages_ms"]), ["copy_static"])
+        self.assertEqual([event["name"] for event in profiler.events], ["copy_static"])
+        report = summary.report({"hits": 5, "misses": 1})
+        self.assertIn("Built 3 pages (1.0 KiB), copied 1 assets (2.0 KiB)", report)
+        self.assertIn("copy_static", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from watch import ReloadHub, diff_snapshots, snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.folder = os.path.join(self.tmp.name, "content")
+        os.makedirs(self.folder)
+        self.page = os.path.join(self.folder, "index.md")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        for path in (self.page, self.template):
+            with open(path, "w") as f:
+                f.write("x")
+
+    def test_snapshot(self):
+        state = snapshot([self.folder], [self.template])
+        self.assertEqual(sorted(state), sorted([self.page, self.template]))
+
+    def test_snapshot_skips_ignored(self):
+        state = snapshot([self.folder], [], ignore=("index.md",))
+        self.assertEqual(state, {})
+
+    def test_diff_snapshots(self):
+        old = snapshot([self.folder], [self.template])
+        with open(self.page, "w") as f:
+            f.write("changed")
+        os.remove(self.template)
+        new = snapshot([self.folder], [self.template])
+        self.assertEqual(diff_snapshots(old, new), ([self.page], [self.template]))
+        self.assertEqual(diff_snapshots(new, new), ([], []))
+
+
+class TestReloadHub(unittest.TestCase):
+    def test_wait_returns_new_version(self):
+        hub = ReloadHub()
+        threading.Timer(0.05, hub.notify).start()
+        self.assertEqual(hub.wait(0, timeout=5), 1)
+
+    def test_wait_timeout(self):
+        hub = ReloadHub()
+        self.assertEqual(hub.wait(0, timeout=0.01), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,28 @@
+import functools
 import re
+from enum import Enum
 
 from htmlnode import LeafNode, ParentNode
 
-text_type_text = "text"
-text_type_bold = "bold"
-text_type_italic = "italic"
-text_type_code = "code"
-text_type_link = "link"
-text_type_image = "image"
+
+class TextType(str, Enum):
+    TEXT = "text"
+    BOLD = "bold"
+    ITALIC = "italic"
+    CODE = "code"
+    LINK = "link"
+    IMAGE = "image"
+
+    def __str__(self):
+        return self.value
+
+
+text_type_text = TextType.TEXT
+text_type_bold = TextType.BOLD
+text_type_italic = TextType.ITALIC
+text_type_code = TextType.CODE
+text_type_link = TextType.LINK
+text_type_image = TextType.IMAGE
 
 markdown_type_map = {
     "**": text_type_bold,
@@ -17,12 +32,17 @@ markdown_type_map = {
 
 
 class TextNode:
-    def __init__(self, text, text_type, url=None):
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(self, text, text_type, url=None, children=None):
         self.text = text
         self.text_type = text_type
         self.url = url
+        self.children = children
 
     def __repr__(self):
+        if self.children:
+            return f"<TextNode {self.text} {self.text_type} {self.url} {self.children}>"
         return f"<TextNode {self.text} {self.text_type} {self.url}>"
 
     def __eq__(self, text_node):
@@ -30,12 +50,33 @@ class TextNode:
             self.text == text_node.text
             and self.text_type == text_node.text_type
             and self.url == text_node.url
+            and self.children == text_node.children
         ):
             return True
         return False
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode | ParentNode:
+def text_node_to_html_node(
+    text_node: TextNode, resolve_url=None, image_attributes=None
+) -> LeafNode | ParentNode:
+    # resolve_url maps the URL of a link or image to the one written, such as
+    # a fingerprinted asset. image_attributes returns the extra attributes of
+    # an image, such as its size.
+    if text_node.children:
+        if text_node.text_type == text_type_bold:
+            tag = "b"
+        elif text_node.text_type == text_type_italic:
+            tag = "i"
+        else:
+            raise ValueError(f"TextNode type {text_node.text_type} can not nest")
+        children = [
+            text_node_to_html_node(n, resolve_url, image_attributes)
+            for n in text_node.children
+        ]
+        return ParentNode(tag, children)
+    url = text_node.url
+    if url is not None and resolve_url is not None:
+        url = resolve_url(url)
     if text_node.text_type == text_type_text:
         return LeafNode(None, text_node.text)
     elif text_node.text_type == text_type_bold:
@@ -45,54 +86,197 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode | ParentNode:
     elif text_node.text_type == text_type_code:
         return LeafNode("code", text_node.text)
     elif text_node.text_type == text_type_link:
-        return LeafNode("a", text_node.text, props={"href": text_node.url})
+        return LeafNode("a", text_node.text, props={"href": url})
     elif text_node.text_type == text_type_image:
-        return LeafNode("img", "", props={"src": text_node.url, "alt": text_node.text})
+        props = {"src": url, "alt": text_node.text}
+        if image_attributes is not None:
+            props.update(image_attributes(text_node.url))
+        return LeafNode("img", "", props=props)
     raise ValueError(f"Don't support TextNode type {text_node.text_type}")
 
 
+@functools.lru_cache(maxsize=None)
+def _inline_scanner(delimiters: tuple, links: bool, images: bool):
+    # One regex finds the next delimiter, longest first, or link start. For
+    # every delimiter the delimiters it could also close are precomputed.
+    names = sorted((delimiter for delimiter, _ in delimiters), key=len, reverse=True)
+    alternatives = [re.escape(delimiter) for delimiter in names]
+    if links or images:
+        alternatives.append(r"!\[")
+    if links:
+        alternatives.append(r"\[")
+    if not alternatives:
+        return None, {}
+    closes = {d: tuple(o for o in names if d.startswith(o)) for d in names}
+    return re.compile("|".join(alternatives)), closes
+
+
+def tokenize_inline(
+    text: str, delimiters: dict = markdown_type_map, links=True, images=True
+) -> list[TextNode]:
+    special_re, closes = _inline_scanner(tuple(delimiters.items()), links, images)
+    match = special_re.search(text) if special_re is not None else None
+    # Most text has no markup at all.
+    if match is None:
+        return [TextNode(text, text_type_text)] if text else []
+
+    # Remembers the last position found for every searched string, so failed
+    # matches never rescan the same text and the whole scan stays linear.
+    found = {}
+
+    def find(needle, start):
+        position = found.get(needle)
+        if position is None or -1 < position < start:
+            position = text.find(needle, start)
+            found[needle] = position
+        return position
+
+    def match_link(start):
+        close = find("]", start + 1)
+        if close == -1 or not text.startswith("(", close + 1):
+            return None
+        end = find(")", close + 2)
+        if end == -1:
+            return None
+        return text[start + 1 : close], text[close + 2 : end], end + 1
+
+    root: list[TextNode] = []
+    # Every open emphasis is a frame of [delimiter, text_type, nodes].
+    stack: list[list] = []
+    open_count = dict.fromkeys(closes, 0)
+    nodes = root
+    plain_start = 0
+    n = len(text)
+
+    def flush(end):
+        # Text right after dissolved frames is merged into their last node.
+        if end > plain_start:
+            chunk = text[plain_start:end]
+            if nodes and nodes[-1].text_type == text_type_text:
+                chunk = nodes.pop().text + chunk
+            nodes.append(TextNode(chunk, text_type_text))
+
+    while match is not None:
+        i = match.start()
+        token = match.group()
+
+        if token[-1] == "[":
+            is_image = token == "!["
+            link = match_link(i + 1 if is_image else i)
+            if link is None:
+                match = special_re.search(text, i + 1)
+                continue
+            if is_image and not images:
+                match = special_re.search(text, link[2])
+                continue
+            flush(i)
+            text_type = text_type_image if is_image else text_type_link
+            nodes.append(TextNode(link[0], text_type, url=link[1]))
+            plain_start = link[2]
+            match = special_re.search(text, plain_start)
+            continue
+
+        end = i + len(token)
+        text_type = delimiters[token]
+        if text_type == text_type_code:
+            close = find(token, end)
+            if close == -1:
+                match = special_re.search(text, end)
+                continue
+            flush(i)
+            nodes.append(TextNode(text[end:close], text_type_code))
+            plain_start = close + len(token)
+            match = special_re.search(text, plain_start)
+            continue
+
+        closing = None
+        if i > 0 and not text[i - 1].isspace():
+            candidates = closes[token]
+            if stack and stack[-1][0] in candidates:
+                closing = stack[-1][0]
+            else:
+                for delimiter in candidates:
+                    if open_count[delimiter]:
+                        closing = delimiter
+                        break
+
+        if closing is not None:
+            flush(i)
+            depth = len(stack) - 1
+            while stack[depth][0] != closing:
+                depth -= 1
+            frame = stack[depth]
+            if depth < len(stack) - 1:
+                for unclosed in stack[depth + 1 :]:
+                    open_count[unclosed[0]] -= 1
+                _dissolve(frame[2], stack[depth + 1 :])
+            del stack[depth:]
+            open_count[closing] -= 1
+            nodes = stack[-1][2] if stack else root
+            nodes.append(_close_emphasis(frame[1], frame[2]))
+            plain_start = i + len(closing)
+            match = special_re.search(text, plain_start)
+            continue
+
+        if end < n and not text[end].isspace():
+            flush(i)
+            stack.append([token, text_type, []])
+            open_count[token] += 1
+            nodes = stack[-1][2]
+            plain_start = end
+        match = special_re.search(text, end)
+
+    flush(n)
+    if stack:
+        _dissolve(root, stack)
+    return root
+
+
+def _dissolve(nodes: list[TextNode], frames: list[list]) -> None:
+    # Delimiters that were never closed are text again, joined with the text
+    # around them into as few nodes as possible.
+    run = []
+    if nodes and nodes[-1].text_type == text_type_text:
+        run.append(nodes.pop().text)
+    for delimiter, _, children in frames:
+        run.append(delimiter)
+        for node in children:
+            if node.text_type == text_type_text:
+                run.append(node.text)
+                continue
+            if run:
+                nodes.append(TextNode("".join(run), text_type_text))
+                run = []
+            nodes.append(node)
+    if run:
+        nodes.append(TextNode("".join(run), text_type_text))
+
+
+def _close_emphasis(text_type: str, children: list[TextNode]) -> TextNode:
+    if not children:
+        return TextNode("", text_type)
+    if len(children) == 1 and children[0].text_type == text_type_text:
+        return TextNode(children[0].text, text_type)
+    text = "".join(child.text for child in children)
+    return TextNode(text, text_type, children=children)
+
+
 def split_nodes_delimiter(
     old_nodes: [TextNode], delimiter: str, text_type: str
 ) -> list[TextNode]:
     new_nodes = []
     for node in old_nodes:
-        new_node = []
         if node.text_type != text_type_text:
             new_nodes.append(node)
             continue
-        nodes_div = node.text.split(delimiter)
-        for i in range(len(nodes_div)):
-            if i % 2 == 0:
-                new_node.append(TextNode(nodes_div[i], node.text_type))
-            else:
-                new_node.append(TextNode(nodes_div[i], text_type))
-        new_nodes.extend(new_node)
+        new_nodes.extend(
+            tokenize_inline(
+                node.text, {delimiter: text_type}, links=False, images=False
+            )
+        )
     return new_nodes
 
 
-# # chaCon: ESTO ES LO QUE QUIERO HACER PARA QUE PERMITA HACER NESTED. QUIERO HACERLO CON STACK PERO
-# # ESTOY TENIENDO PROBLEMAS PARA EL DOBLE **, TALVES HACERLO CON RECURSION SEA MEJOR.
-#
-# def split_nodes(old_nodes: list[TextNode]) -> list[TextNode]:
-#     new_nodes = []
-#     for node in old_nodes:
-#         text_nodes = split_node(node)
-#         new_nodes.extend(text_nodes)
-#     return new_nodes
-#
-# def split_node(old_node: TextNode) -> list[TextNode]:
-#     stack = []
-#     text_before = []
-#     for c in old_node.text:
-#         if c in stack:
-#             pass
-#         if c in markdown_type_map:
-#             stack.append(c)
-#         else:
-#             text_before.append(c)
-#     raise NotImplementedError
-
-
 def extract_markdown_images(text: str) -> list[tuple]:
     text_re = re.findall(r"!\[(.*?)\]\((.*?)\)", text)
     return text_re
@@ -109,14 +293,7 @@ def split_nodes_image(old_nodes: [TextNode]) -> list[TextNode]:
         if node.text_type != text_type_text:
             new_nodes.append(node)
             continue
-        images = extract_markdown_images(node.text)
-        if len(images) == 0:
-            new_nodes.append(node)
-            continue
-        new_node = helper_create_text_node_with_links(
-            node.text, images, text_type_image
-        )
-        new_nodes.extend(new_node)
+        new_nodes.extend(tokenize_inline(node.text, {}, links=False, images=True))
     return new_nodes
 
 
@@ -126,12 +303,7 @@ def split_nodes_link(old_nodes: [TextNode]) -> list[TextNode]:
         if node.text_type != text_type_text:
             new_nodes.append(node)
             continue
-        links = extract_markdown_links(node.text)
-        if len(links) == 0:
-            new_nodes.append(node)
-            continue
-        new_node = helper_create_text_node_with_links(node.text, links, text_type_link)
-        new_nodes.extend(new_node)
+        new_nodes.extend(tokenize_inline(node.text, {}, links=True, images=False))
     return new_nodes
 
 
@@ -139,6 +311,7 @@ def helper_create_text_node_with_links(
     text: str, links: list[tuple], text_type: str
 ) -> list[TextNode]:
     result = []
+    position = 0
     for link in links:
         alt = link[0]
         url = link[1]
@@ -148,21 +321,16 @@ def helper_create_text_node_with_links(
             text_url = f"[{alt}]({url})"
         else:
             raise ValueError(f"{text_type} not supported")
-        sections = text.split(text_url, 1)
-        result.append(TextNode(sections[0], text_type_text))
-        text = text.replace(sections[0], "")
+        start = text.find(text_url, position)
+        if start == -1:
+            continue
+        result.append(TextNode(text[position:start], text_type_text))
         result.append(TextNode(alt, text_type, url=url))
-        text = text.replace(text_url, "")
-    if text:
-        result.append(TextNode(text, text_type_text))
+        position = start + len(text_url)
+    if position < len(text):
+        result.append(TextNode(text[position:], text_type_text))
     return result
 
 
 def text_to_textnodes(text: str) -> list[TextNode]:
-    new_node = TextNode(text, text_type_text)
-    bold_add = split_nodes_delimiter([new_node], "**", text_type_bold)
-    italic_add = split_nodes_delimiter(bold_add, "*", text_type_italic)
-    code_add = split_nodes_delimiter(italic_add, "`", text_type_code)
-    link_add = split_nodes_link(code_add)
-    image_add = split_nodes_image(link_add)
-    return image_add
+    return tokenize_inline(text)
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+PROFILE_PATH = "profile.json"
+
+
+class BuildProfiler:
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.events = []
+        self.pages = []
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, page: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.events.append(
+                {
+                    "name": name,
+                    "page": page,
+                    "ts": start,
+                    "dur": time.perf_counter_ns() - start,
+                    "pid": os.getpid(),
+                    "tid": threading.get_native_id(),
+                }
+            )
+
+    @contextmanager
+    def page(self, page: str):
+        if self.memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter_ns()
+        try:
+            with self.stage("page", page):
+                yield
+        finally:
+            record = {"page": page, "dur": time.perf_counter_ns() - start}
+            if self.memory:
+                _, peak = tracemalloc.get_traced_memory()
+                record["peak_memory"] = peak - before
+            self.pages.append(record)
+
+    def merge(self, events: list[dict], pages: list[dict]) -> None:
+        self.events.extend(events)
+        self.pages.extend(pages)
+
+    def to_trace(self) -> dict:
+        origin = min((event["ts"] for event in self.events), default=0)
+        peaks = {record["page"]: record.get("peak_memory") for record in self.pages}
+        trace_events = []
+        for event in self.events:
+            args = {"page": event["page"]}
+            if event["name"] == "page" and peaks.get(event["page"]) is not None:
+                args["peak_memory"] = peaks[event["page"]]
+            trace_events.append(
+                {
+                    "name": event["name"],
+                    "cat": "build",
+                    "ph": "X",
+                    "ts": (event["ts"] - origin) / 1000,
+                    "dur": event["dur"] / 1000,
+                    "pid": event["pid"],
+                    "tid": event["tid"],
+                    "args": args,
+                }
+            )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: str = PROFILE_PATH) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_trace(), f)
+
+    def stage_totals(self) -> dict:
+        totals = {}
+        for event in self.events:
+            if event["name"] != "page":
+                totals[event["name"]] = totals.get(event["name"], 0) + event["dur"]
+        return totals
+
+    def summary(self, top=10) -> str:
+        lines = ["Time per stage:"]
+        for name, total in sorted(self.stage_totals().items(), key=lambda x: -x[1]):
+            lines.append(f"  {name:24} {total / 1e6:10.2f} ms")
+        slowest = sorted(self.pages, key=lambda record: -record["dur"])[:top]
+        lines.append(f"Slowest {len(slowest)} pages:")
+        for record in slowest:
+            line = f"  {record['dur'] / 1e6:10.2f} ms"
+            if "peak_memory" in record:
+                line += f" {record['peak_memory'] / 1024:10.1f} KiB peak"
+            lines.append(f"{line}  {record['page']}")
+        return "\n".join(lines)
+
+
+class BuildSummary:
+    # Totals for the line printed at the end of every build. Unlike the
+    # profiler it is always on, so it only counts and times whole stages.
+    def __init__(self):
+        self.counts = {"pages": 0, "page_bytes": 0, "assets": 0, "asset_bytes": 0}
+        self.stages = {}
+        self.start = time.perf_counter_ns()
+
+    def add(self, name: str, value=1) -> None:
+        self.counts[name] += value
+
+    def merge(self, counts: dict) -> None:
+        for name, value in counts.items():
+            self.counts[name] += value
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            self.stages[name] = self.stages.get(name, 0) + duration
+
+    def fields(self, cache_stats: dict | None = None) -> dict:
+        fields = dict(self.counts)
+        fields["seconds"] = round((time.perf_counter_ns() - self.start) / 1e9, 3)
+        fields["stages_ms"] = {
+            name: round(total / 1e6, 2) for name, total in self.stages.items()
+        }
+        if cache_stats is not None:
+            fields["cache_hits"] = cache_stats["hits"]
+            fields["cache_misses"] = cache_stats["misses"]
+        return fields
+
+    def report(self, cache_stats: dict | None = None) -> str:
+        fields = self.fields(cache_stats)
+        line = (
+            f"Built {fields['pages']} pages ({fields['page_bytes'] / 1024:.1f} KiB)"
+            f", copied {fields['assets']} assets"
+            f" ({fields['asset_bytes'] / 1024:.1f} KiB)"
+        )
+        if cache_stats is not None:
+            line += f", {fields['cache_hits']} block cache hits"
+        lines = [f"{line} in {fields['seconds']:.2f} s"]
+        if fields["stages_ms"]:
+            stages = sorted(fields["stages_ms"].items(), key=lambda x: -x[1])
+            totals = ", ".join(f"{name} {total:.1f} ms" for name, total in stages)
+            lines.append(f"Stages: {totals}")
+        return "\n".join(lines)
+
+
+_build_summary = BuildSummary()
+
+
+def reset_build_summary() -> BuildSummary:
+    global _build_summary
+    _build_summary = BuildSummary()
+    return _build_summary
+
+
+def get_build_summary() -> BuildSummary:
+    return _build_summary
+
+
+def stage_timer(profiler: BuildProfiler | None, summary: BuildSummary | None = None):
+    if summary is not None:
+
+        @contextmanager
+        def stage(name: str, page: str):
+            with summary.stage(name), stage_timer(profiler)(name, page):
+                yield
+
+        return stage
+    if profiler is None:
+        return lambda name, page: nullcontext()
+    return profiler.stage
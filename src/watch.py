@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from inventory import IGNORE_PATTERNS, scan_tree
+
+logger = logging.getLogger(__name__)
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+def snapshot(folders: list[str], files: list[str], ignore=IGNORE_PATTERNS) -> dict:
+    state = {}
+    for folder in folders:
+        for path, _, stat in scan_tree(folder, ignore):
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+    for path in files:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def diff_snapshots(old: dict, new: dict) -> tuple[list[str], list[str]]:
+    changed = [path for path, state in new.items() if old.get(path) != state]
+    removed = [path for path in old if path not in new]
+    return sorted(changed), sorted(removed)
+
+
+class ReloadHub:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self) -> None:
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class ReloadRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, hub: ReloadHub, **kwargs):
+        self.hub = hub
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        script = RELOAD_SCRIPT.encode("utf-8")
+        if b"</body>" in body:
+            body = body.replace(b"</body>", script + b"</body>", 1)
+        else:
+            body += script
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.hub.version
+        try:
+            while True:
+                new_version = self.hub.wait(version, timeout=15)
+                if new_version != version:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        logger.info(format, *args)
+
+
+def serve(dest_dir: str, port: int, hub: ReloadHub) -> ThreadingHTTPServer:
+    handler = partial(ReloadRequestHandler, directory=dest_dir, hub=hub)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(
+    folders: list[str],
+    files,
+    on_change,
+    dest_dir: str,
+    port=8888,
+    interval=0.2,
+    verbose=True,
+    ignore=IGNORE_PATTERNS,
+) -> None:
+    hub = ReloadHub()
+    server = serve(dest_dir, port, hub)
+    if verbose:
+        print(f"Serving {dest_dir} on http://localhost:{port} and watching for changes")
+    state = snapshot(folders, files(), ignore)
+    try:
+        while True:
+            time.sleep(interval)
+            new_state = snapshot(folders, files(), ignore)
+            changed, removed = diff_snapshots(state, new_state)
+            if not changed and not removed:
+                continue
+            state = new_state
+            start = time.perf_counter()
+            try:
+                on_change(changed, removed)
+            except Exception as e:
+                logger.exception("rebuild failed")
+                if verbose:
+                    print(f"Rebuild failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            logger.info("Rebuilt in %.1f ms", elapsed, extra={"event": "rebuild"})
+            if verbose:
+                print(f"Rebuilt in {elapsed:.1f} ms")
+            hub.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()